@@ -0,0 +1,200 @@
+"""
+非同期サーバーモード（aiohttp）
+
+/api/* のブロッキング処理（yfinance取得・モデル予測）を上限付きスレッドプールに逃がし、
+イベントループ側では待機中の接続をほぼコストなしで保持する。
+同じデータへの同時リクエストは1回の計算を共有し、クライアント切断時は
+誰も待っていない未着手の計算をキャンセルする。
+
+それ以外のパス（/, /charts/... など）は Flask アプリをスレッドプール上で実行して返す。
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+import web_dashboard
+
+
+class SingleFlight:
+    """同一キーの同時呼び出しを1回の実行にまとめる
+
+    実行中の計算はスレッドプール側のジョブが終わるまで登録したままにし、
+    後から来た同じリクエストにも共有する。全員が切断した場合は、
+    まだ着手していないジョブだけを取り消す。
+    """
+
+    def __init__(self, loop, executor):
+        self._loop = loop
+        self._executor = executor
+        self._calls = {}  # key -> [concurrent.futures.Future, asyncio.Future, 待機者数]
+
+    async def do(self, key, func, *args):
+        call = self._calls.get(key)
+        if call is None:
+            job = self._executor.submit(func, *args)
+            call = self._calls[key] = [job, asyncio.wrap_future(job, loop=self._loop), 0]
+            job.add_done_callback(
+                lambda _: self._loop.call_soon_threadsafe(self._forget, key, call))
+
+        call[2] += 1
+        try:
+            # 他の待機者がいる可能性があるため shield して直接キャンセルさせない
+            return await asyncio.shield(call[1])
+        except asyncio.CancelledError:
+            # 最後の待機者が切断: 未着手のジョブだけを取り消す（実行中なら完了まで共有を続ける）
+            if call[2] == 1 and call[0].cancel():
+                self._forget(key, call)
+            raise
+        finally:
+            call[2] -= 1
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+# APIパス -> スナップショット名（web_dashboard.SNAPSHOTS の共有JSONをそのまま返す）
+API_ROUTES = {
+    '/api/tasks': 'tasks',
+    '/api/prediction': 'prediction',
+    '/api/adaptive': 'adaptive_params',
+    '/api/comparison': 'system_comparison',
+    '/api/correlation': 'correlation',
+}
+
+
+def _json(data):
+    return web.json_response(data, dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+
+
+def _raw(request, payload):
+    """シリアライズ済みJSONをそのまま返す（内容が同じなら 304）"""
+    etag = web_dashboard.payload_etag(payload)
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+    if request.headers.get('If-None-Match') == headers['ETag']:
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=payload, content_type='application/json', headers=headers)
+
+
+def create_app(max_workers=8):
+    """aiohttp アプリケーションを生成"""
+    app = web.Application()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dashboard')
+
+    async def on_startup(app):
+        app['flight'] = SingleFlight(asyncio.get_running_loop(), executor)
+
+    async def on_cleanup(app):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    def snapshot(flight, name):
+        return flight.do(name, web_dashboard.snapshot_json, name, web_dashboard.SNAPSHOTS[name])
+
+    def api_handler(name):
+        async def handler(request):
+            return _raw(request, await snapshot(request.app['flight'], name))
+        return handler
+
+    async def api_accuracy(request):
+        return _json(await request.app['flight'].do('accuracy', web_dashboard.get_prediction_accuracy))
+
+    async def api_risk(request):
+        return _raw(request, await request.app['flight'].do(
+            'risk', web_dashboard.snapshot_json, 'risk', web_dashboard.get_risk_simulation
+        ))
+
+    def timeframe_handler(func, default_bars):
+        # タイムフレーム・本数ごとに計算を共有
+        async def handler(request):
+            args = web_dashboard._timeframe_args(request.query, default_bars=default_bars)
+            return _json(await request.app['flight'].do((func.__name__,) + args, func, *args))
+        return handler
+
+    async def api_history(request):
+        try:
+            kwargs = web_dashboard._history_args(request.query)
+        except ValueError as e:
+            return web.json_response([{'error': str(e)}], status=400)
+        key = ('trade_history',) + tuple(sorted(kwargs.items()))
+        return _json(await request.app['flight'].do(
+            key, functools.partial(web_dashboard.get_trade_history, **kwargs)
+        ))
+
+    async def api_status(request):
+        # 予測の台帳記録を比較表より先に行うため、比較表は最後に取得
+        flight = request.app['flight']
+        parts = [p for p in web_dashboard.SNAPSHOTS if p != 'system_comparison']
+        results = await asyncio.gather(*(snapshot(flight, p) for p in parts))
+        status = dict(zip(parts, results))
+        status['system_comparison'] = await snapshot(flight, 'system_comparison')
+        body = b','.join(b'"%s":%s' % (p.encode('ascii'), status[p]) for p in web_dashboard.SNAPSHOTS)
+        return _raw(request, b'{' + body + b'}')
+
+    async def wsgi_fallback(request):
+        """API以外のパスは Flask アプリで処理"""
+        body = await request.read()
+        builder = EnvironBuilder(
+            path=request.path,
+            method=request.method,
+            query_string=request.query_string,
+            headers=list(request.headers.items()),
+            data=body,
+        )
+        environ = builder.get_environ()
+        builder.close()
+
+        def run():
+            app_iter, status, headers = run_wsgi_app(web_dashboard.app, environ, buffered=True)
+            try:
+                return status, headers, b''.join(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+
+        status, headers, payload = await asyncio.get_running_loop().run_in_executor(executor, run)
+        response = web.Response(status=int(status.split(' ', 1)[0]), body=payload)
+        for name, value in headers.items():
+            if name.lower() not in ('content-length', 'transfer-encoding'):
+                response.headers[name] = value
+        return response
+
+    app.router.add_get('/api/status', api_status)
+    app.router.add_get('/api/market', timeframe_handler(web_dashboard.get_market_statistics, 24))
+    app.router.add_get('/api/ohlc', timeframe_handler(web_dashboard.get_ohlc_bars, 200))
+    app.router.add_get('/api/history', api_history)
+    app.router.add_get('/api/accuracy', api_accuracy)
+    app.router.add_get('/api/risk', api_risk)
+    for path, name in API_ROUTES.items():
+        app.router.add_get(path, api_handler(name))
+    app.router.add_route('*', '/{tail:.*}', wsgi_fallback)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ダッシュボード非同期サーバー')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=8, help='ブロッキング処理用スレッド数')
+    args = parser.parse_args()
+
+    print("\n" + "=" * 80)
+    print("リアルタイム取引モニタリングダッシュボード（非同期モード）")
+    print("=" * 80)
+    print(f"\nアクセスURL: http://localhost:{args.port}")
+    print(f"ワーカースレッド: {args.workers}")
+    print("\n停止: Ctrl+C")
+    print("=" * 80)
+    print("")
+
+    # クライアント切断時にハンドラをキャンセルし、SingleFlight に伝播させる
+    web.run_app(create_app(args.workers), host=args.host, port=args.port,
+                handler_cancellation=True)
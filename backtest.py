@@ -0,0 +1,265 @@
+"""
+閾値バックテスト（パラメータスイープ）
+
+予測台帳のシグナルと価格を再生し、信頼度閾値 × 期待リターン閾値のグリッドを
+NumPy でまとめて評価する。適応モデルは Kelly 分数 × レバレッジも掃引し、
+サイズ設定ごとの計算をプロセスプールに分散する。
+結果は P&L・Sharpe・最大ドローダウンのヒートマップ（配列）として返す。
+Sharpe はサイズ設定（建玉比率の倍率）に依存しないため閾値の選択にだけ使い、
+サイズ設定は最大ドローダウン上限の範囲で複利 P&L が最大のものを選ぶ。
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from prediction_ledger import MODELS
+
+# モデルごとの既定サイズ設定
+FIXED_SIZING = {'kelly': [0.70], 'leverage': [10.0]}
+ADAPTIVE_SIZING = {
+    'kelly': [0.30, 0.40, 0.50, 0.60, 0.65],
+    'leverage': [3.0, 5.0, 7.0, 9.0],
+}
+DEFAULT_CONFIDENCE = np.round(np.arange(0.50, 0.951, 0.05), 2).tolist()
+
+SECONDS_PER_YEAR = 365 * 86400
+
+# グリッド1軸あたりの最大点数
+MAX_GRID_POINTS = 200
+# 1回のスイープで評価するセル数（kelly × leverage × 信頼度 × 期待リターン × シグナル数）の上限
+MAX_SWEEP_CELLS = 20_000_000
+# 1タスクの作業配列の要素数（信頼度 × 期待リターン × シグナル数）の目安
+MAX_TASK_CELLS = 2_000_000
+# 最良サイズ設定を選ぶときの最大ドローダウン上限（%）
+MAX_DRAWDOWN_LIMIT = 30.0
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def parse_grid(spec):
+    """'0.5:0.8:0.05'（両端含む）または '0.5,0.6,0.7' をリストに変換"""
+    if spec is None or spec == '':
+        return None
+    if ':' in spec:
+        start, stop, step = (float(v) for v in spec.split(':'))
+        if not np.all(np.isfinite([start, stop, step])):
+            raise ValueError('グリッドには有限の値を指定してください')
+        if step <= 0:
+            raise ValueError('step は正の値を指定してください')
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    else:
+        count = spec.count(',') + 1
+    if count <= 0:
+        raise ValueError('グリッドが空です（開始 > 終了）')
+    if count > MAX_GRID_POINTS:
+        raise ValueError(f'グリッドが大きすぎます（最大{MAX_GRID_POINTS}点）')
+    if ':' in spec:
+        return np.round(start + step * np.arange(count), 10).tolist()
+    values = [float(v) for v in spec.split(',')]
+    if not np.all(np.isfinite(values)):
+        raise ValueError('グリッドには有限の値を指定してください')
+    return values
+
+
+def replay_signals(records, model, bar_times, closes, horizon=1):
+    """台帳レコードから評価用の配列を作成
+
+    各シグナルの時刻から horizon 本先の終値までの価格リターンを計算し、
+    決済バーがまだ確定していないシグナル（最新バーは形成中）は除外する。
+    保有期間が重ならないよう、直前に採用したシグナルから horizon 本以上
+    離れたシグナルだけを使う（同じバーの値動きを複数回数えない）。
+
+    Returns:
+        dict: time, direction, confidence, abs_return（期待リターンの絶対値）, price_return
+    """
+    rows = records[records['model'] == MODELS.index(model)] if len(records) else records
+    rows = rows[np.argsort(rows['timestamp'], kind='stable')]
+
+    bar_times = np.asarray(bar_times, dtype=np.int64)
+    closes = np.asarray(closes, dtype=np.float64)
+    entry_pos = np.searchsorted(bar_times, rows['timestamp'], side='right') - 1
+    exit_pos = entry_pos + horizon
+    ok = (entry_pos >= 0) & (exit_pos < len(bar_times) - 1)
+    rows, entry_pos, exit_pos = rows[ok], entry_pos[ok], exit_pos[ok]
+
+    keep = np.zeros(len(entry_pos), dtype=bool)
+    next_entry = -1
+    for i, pos in enumerate(entry_pos):
+        if pos >= next_entry:
+            keep[i] = True
+            next_entry = pos + horizon
+    rows, entry_pos, exit_pos = rows[keep], entry_pos[keep], exit_pos[keep]
+
+    return {
+        'time': rows['timestamp'].astype(np.int64),
+        'direction': rows['direction'].astype(np.float64),
+        'confidence': rows['confidence'].astype(np.float64),
+        'abs_return': np.abs(rows['expected_return'].astype(np.float64)),
+        'price_return': closes[exit_pos] / closes[entry_pos] - 1.0,
+    }
+
+
+def evaluate_grid(direction, confidence, abs_return, price_return,
+                  conf_grid, ret_grid, size, periods_per_year):
+    """1つのサイズ設定（kelly × leverage）について閾値グリッド全体を評価
+
+    Returns:
+        dict: pnl, sharpe, max_drawdown, trades, win_rate（形状: [信頼度, 期待リターン]）
+    """
+    conf_grid = np.asarray(conf_grid, dtype=np.float64)
+    ret_grid = np.asarray(ret_grid, dtype=np.float64)
+
+    # 取引するか: [信頼度, 期待リターン, シグナル]
+    take = ((confidence[None, None, :] >= conf_grid[:, None, None]) &
+            (abs_return[None, None, :] >= ret_grid[None, :, None]))
+    signed = direction * price_return
+    bar_return = np.where(take, size * signed, 0.0)
+
+    # 複利の資産曲線（対数で累積）
+    log_equity = np.cumsum(np.log1p(np.maximum(bar_return, -0.999999)), axis=-1)
+    pnl = np.expm1(log_equity[..., -1]) * 100 if log_equity.shape[-1] else np.zeros(take.shape[:2])
+
+    running_max = np.maximum.accumulate(np.maximum(log_equity, 0.0), axis=-1)
+    drawdown = -np.expm1(log_equity - running_max)
+    max_drawdown = drawdown.max(axis=-1) * 100 if drawdown.shape[-1] else np.zeros(take.shape[:2])
+
+    mean = bar_return.mean(axis=-1)
+    std = bar_return.std(axis=-1, ddof=1) if bar_return.shape[-1] > 1 else np.zeros_like(mean)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), 0.0)
+
+    trades = take.sum(axis=-1)
+    wins = (take & (signed > 0)).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(trades > 0, wins / trades, 0.0)
+
+    return {
+        'pnl': pnl,
+        'sharpe': sharpe,
+        'max_drawdown': max_drawdown,
+        'trades': trades,
+        'win_rate': win_rate,
+    }
+
+
+def _evaluate_task(args):
+    """プロセスプール用のエントリポイント"""
+    signals, conf_grid, ret_grid, size, periods_per_year = args
+    return evaluate_grid(signals['direction'], signals['confidence'], signals['abs_return'],
+                         signals['price_return'], conf_grid, ret_grid, size, periods_per_year)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _pool
+
+
+def run_sweep(signals, conf_grid, ret_grid, kelly_grid, leverage_grid, parallel=True,
+              max_drawdown=MAX_DRAWDOWN_LIMIT):
+    """閾値 × サイズ設定のグリッドを評価
+
+    最良セルは、閾値を Sharpe 最大で選んだうえで、そのセルで最大ドローダウンが
+    max_drawdown（%）以下のサイズ設定のうち複利 P&L が最大のものとする
+    （上限内のサイズ設定が無い場合は最大ドローダウンが最小のもの）。
+
+    Returns:
+        dict: 各指標の配列（形状: [kelly, leverage, 信頼度, 期待リターン]）と最良セル
+    """
+    n = len(signals['time'])
+    if n < 2:
+        raise ValueError('評価できるシグナルが不足しています（2件以上必要）')
+    cells = len(kelly_grid) * len(leverage_grid) * len(conf_grid) * len(ret_grid) * n
+    if cells > MAX_SWEEP_CELLS:
+        raise ValueError(f'グリッドが大きすぎます（グリッド点数 × シグナル数 {cells:,} が上限 '
+                         f'{MAX_SWEEP_CELLS:,} を超えています）')
+
+    step = float(np.median(np.diff(signals['time']))) if n > 1 else 3600.0
+    periods_per_year = SECONDS_PER_YEAR / max(step, 1.0)
+    compact = {k: signals[k] for k in ('direction', 'confidence', 'abs_return', 'price_return')}
+
+    # サイズ設定が少ない場合は信頼度閾値の軸も分割してコアを使い切る。
+    # 1タスクの作業配列（信頼度 × 期待リターン × シグナル）が大きい場合も分割する
+    sizes = [k * l for k in kelly_grid for l in leverage_grid]
+    workers = os.cpu_count() or 1
+    n_chunks = max(1, workers // len(sizes)) if parallel else 1
+    n_chunks = min(len(conf_grid), max(n_chunks, -(-len(conf_grid) * len(ret_grid) * n // MAX_TASK_CELLS)))
+    chunks = [c.tolist() for c in np.array_split(np.asarray(conf_grid, dtype=np.float64), n_chunks)]
+    tasks = [(compact, chunk, ret_grid, size, periods_per_year) for size in sizes for chunk in chunks]
+    if parallel and len(tasks) > 1:
+        results = list(_get_pool().map(_evaluate_task, tasks))
+    else:
+        results = [_evaluate_task(t) for t in tasks]
+
+    shape = (len(kelly_grid), len(leverage_grid), len(conf_grid), len(ret_grid))
+    metrics = {}
+    for name in ('pnl', 'sharpe', 'max_drawdown', 'trades', 'win_rate'):
+        per_size = [np.concatenate([r[name] for r in results[i:i + n_chunks]], axis=0)
+                    for i in range(0, len(results), n_chunks)]
+        metrics[name] = np.stack(per_size).reshape(shape)
+
+    # Sharpe はサイズ設定に依存しないので閾値の選択だけに使う
+    c, r = np.unravel_index(np.argmax(metrics['sharpe'][0, 0]), shape[2:])
+    pnl = metrics['pnl'][:, :, c, r]
+    drawdown = metrics['max_drawdown'][:, :, c, r]
+    allowed = drawdown <= max_drawdown
+    if allowed.any():
+        k, l = np.unravel_index(np.argmax(np.where(allowed, pnl, -np.inf)), shape[:2])
+    else:
+        k, l = np.unravel_index(np.argmin(drawdown), shape[:2])
+    best = (int(k), int(l), int(c), int(r))
+    metrics['best'] = {
+        'kelly': float(kelly_grid[best[0]]),
+        'leverage': float(leverage_grid[best[1]]),
+        'confidence_threshold': float(conf_grid[best[2]]),
+        'min_return': float(ret_grid[best[3]]),
+        'pnl': float(metrics['pnl'][best]),
+        'sharpe': float(metrics['sharpe'][best]),
+        'max_drawdown': float(metrics['max_drawdown'][best]),
+        'trades': int(metrics['trades'][best]),
+        'max_drawdown_limit': float(max_drawdown),
+        'within_limit': bool(allowed.any()),
+    }
+    metrics['index'] = best
+    return metrics
+
+
+def default_return_grid(abs_return, points=10):
+    """期待リターン閾値の既定グリッド（実データの分位点）"""
+    if len(abs_return) == 0:
+        return [0.0]
+    return np.unique(np.round(np.quantile(abs_return, np.linspace(0, 0.9, points)), 6)).tolist()
+
+
+def plot_heatmap(metrics, conf_grid, ret_grid, fig):
+    """最良サイズ設定における P&L・Sharpe・最大DD のヒートマップを描画（Sharpe はサイズ設定に依存しない）"""
+    k, l = metrics['index'][:2]
+    axes = fig.subplots(1, 3)
+    panels = (
+        ('pnl', 'P&L (%)', 'RdYlGn'),
+        ('sharpe', 'Sharpe', 'RdYlGn'),
+        ('max_drawdown', 'Max DD (%)', 'RdYlGn_r'),
+    )
+    for ax, (name, title, cmap) in zip(axes, panels):
+        data = metrics[name][k, l]
+        im = ax.imshow(data, origin='lower', aspect='auto', cmap=cmap)
+        ax.set_title(title, fontsize=12, fontweight='bold')
+        ax.set_xticks(range(len(ret_grid)))
+        ax.set_xticklabels([f'{v:.3g}' for v in ret_grid], rotation=45, ha='right', fontsize=8)
+        ax.set_yticks(range(len(conf_grid)))
+        ax.set_yticklabels([f'{v:.2f}' for v in conf_grid], fontsize=8)
+        ax.set_xlabel('min expected return')
+        ax.set_ylabel('confidence threshold')
+        fig.colorbar(im, ax=ax)
+    best = metrics['best']
+    fig.suptitle(f"kelly={best['kelly']:.2f} leverage={best['leverage']:.1f}x "
+                 f"(max DD <= {best['max_drawdown_limit']:.0f}%)", fontweight='bold')
+    fig.tight_layout()
+    return fig
+
@@ -0,0 +1,148 @@
+"""
+コンテンツアドレス型チャート画像キャッシュ
+
+入力データと描画パラメータのハッシュをキーにチャート画像を保存し、
+同じキーが既に存在する場合は描画をスキップする。
+画像は複数サイズで保存し、古い描画は LRU で削除する。
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# サイズ名 -> 保存DPI（図のサイズは共通）
+CHART_SIZES = {
+    'full': 150,
+    'medium': 90,
+    'thumb': 45,
+}
+
+KEY_PATTERN = re.compile(r'^[0-9a-f]{16,64}$')
+
+
+def chart_key(data, params):
+    """入力データ（DataFrame）と描画パラメータからキャッシュキーを生成"""
+    h = hashlib.sha256()
+    h.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    h.update(data.index.asi8.tobytes() if hasattr(data.index, 'asi8') else str(list(data.index)).encode('utf-8'))
+    for column in sorted(data.columns):
+        h.update(str(column).encode('utf-8'))
+        h.update(data[column].to_numpy(dtype='float64', na_value=float('nan')).tobytes())
+    return h.hexdigest()[:32]
+
+
+class ChartCache:
+    """描画済みチャートのディスクキャッシュ（LRU削除付き）"""
+
+    def __init__(self, directory, max_entries=32):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._rendering = {}  # 描画中のキー -> 完了通知（同じキーの重複描画を防ぐ）
+        self.latest_key = None
+        self._scan()
+
+    def _scan(self):
+        """既存ファイルから LRU 順序を復元（更新時刻が古い順）"""
+        if not os.path.isdir(self.directory):
+            return
+        mtimes = {}
+        for name in os.listdir(self.directory):
+            key, _, rest = name.partition('-')
+            if KEY_PATTERN.match(key) and rest.endswith('.png'):
+                mtime = os.path.getmtime(os.path.join(self.directory, name))
+                mtimes[key] = max(mtimes.get(key, 0), mtime)
+        for key in sorted(mtimes, key=mtimes.get):
+            if self._complete(key):
+                self._entries[key] = True
+        if self._entries:
+            self.latest_key = next(reversed(self._entries))
+
+    def path(self, key, size='full'):
+        return os.path.join(self.directory, f'{key}-{size}.png')
+
+    def _complete(self, key):
+        return all(os.path.exists(self.path(key, size)) for size in CHART_SIZES)
+
+    def get(self, key):
+        """キーが存在すれば LRU 位置を更新して True
+
+        他のワーカープロセスが描画・削除した画像もディスク上の有無で判定する。
+        """
+        with self._lock:
+            if not self._complete(key):
+                self._entries.pop(key, None)
+                return False
+            self._entries[key] = True
+            self._touch(key)
+            self._evict()
+            return True
+
+    def _touch(self, key):
+        self._entries.move_to_end(key)
+        self.latest_key = key
+        for size in CHART_SIZES:
+            try:
+                os.utime(self.path(key, size))
+            except OSError:
+                pass
+
+    def get_or_render(self, key, render):
+        """キーが無ければ render(fig を返す関数) で描画して全サイズを保存
+
+        Returns:
+            bool: キャッシュヒットなら True
+        """
+        # 描画はロックの外で行い、その間も get()（画像配信）を止めない
+        while True:
+            with self._lock:
+                if self._complete(key):
+                    self._entries[key] = True
+                    self._touch(key)
+                    return True
+                done = self._rendering.get(key)
+                if done is None:
+                    done = self._rendering[key] = threading.Event()
+                    break
+            # 同じキーを描画中のスレッドを待ってから再確認（失敗していれば自分で描画）
+            done.wait()
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fig = render()
+            try:
+                for size, dpi in CHART_SIZES.items():
+                    path = self.path(key, size)
+                    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                    fig.savefig(tmp_path, format='png', dpi=dpi, bbox_inches='tight')
+                    os.replace(tmp_path, path)
+            finally:
+                fig.clear()
+
+            with self._lock:
+                self._entries[key] = True
+                self.latest_key = key
+                self._evict()
+            return False
+        finally:
+            with self._lock:
+                self._rendering.pop(key, None)
+            done.set()
+
+    def _evict(self):
+        """上限を超えた古い描画を削除"""
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            for size in CHART_SIZES:
+                try:
+                    os.remove(self.path(key, size))
+                except OSError:
+                    pass
+
+    def urls(self, key, prefix='/charts'):
+        """サイズ名 -> 配信URL"""
+        return {size: f'{prefix}/{key}/{size}.png' for size in CHART_SIZES}
@@ -0,0 +1,266 @@
+"""
+コンパクトな価格・特徴量フレームとメモリ計測
+
+価格・特徴量を float32 の連続ブロック（列 × 行）に格納し、同じ時刻インデックスは
+フレーム間で1つの配列を共有する。pct_change / rolling は出力先配列へ直接書き込む
+カーネルで計算し、途中の Series を作らない。
+DASHBOARD_COMPACT=1 で有効化（既定は従来どおり float64 の DataFrame）。
+
+MemoryAccounting はコンポーネントごとの保持バイト数とプロセスの RSS をまとめて報告する。
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+COMPACT_DTYPE = np.float32
+
+
+def compact_enabled():
+    """コンパクトモードが有効か（環境変数 DASHBOARD_COMPACT）"""
+    return os.environ.get('DASHBOARD_COMPACT', '0').lower() in ('1', 'true', 'yes')
+
+
+def epoch_seconds(index):
+    """日時インデックスを UNIX秒（int64）に変換（インデックスの時間分解能に依存しない）"""
+    return pd.DatetimeIndex(pd.to_datetime(index)).as_unit('s').asi8
+
+
+# 時刻インデックスの共有（内容が同じなら同じ配列・同じ DatetimeIndex を返す）
+_indexes = weakref.WeakValueDictionary()
+_datetime_indexes = weakref.WeakValueDictionary()
+_index_lock = threading.Lock()
+# 生存中の列ブロック（id -> [バイト数, 保持しているフレーム・DataFrame の数]、メモリ計測用）
+_blocks = {}
+_block_lock = threading.RLock()  # GC 中の解放コールバックから再入されるため RLock
+
+
+def _intern_index(times):
+    times = np.ascontiguousarray(times, dtype=np.int64)
+    digest = hashlib.blake2b(times.tobytes(), digest_size=16).digest()
+    with _index_lock:
+        index = _indexes.get(digest)
+        if index is None:
+            index = times.copy() if times.flags.writeable else times
+            index.flags.writeable = False
+            _indexes[digest] = index
+        return digest, index
+
+
+def shared_index(times):
+    """時刻配列（int64、UNIX秒）を共有インデックスとして登録し、読み取り専用配列を返す"""
+    return _intern_index(times)[1]
+
+
+def _retain(owner, block):
+    """owner（CompactFrame またはブロックを共有する DataFrame）が生存している間だけブロックを計上"""
+    key = id(block)
+    with _block_lock:
+        entry = _blocks.setdefault(key, [block.nbytes, 0])
+        entry[1] += 1
+    weakref.finalize(owner, _release, key)
+
+
+def _release(key):
+    with _block_lock:
+        entry = _blocks[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _blocks[key]
+
+
+class CompactFrame:
+    """float32 の連続ブロックと共有時刻インデックスからなる軽量フレーム"""
+
+    def __init__(self, index, columns):
+        self._digest, self.index = _intern_index(index)
+        self.columns = list(columns)
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        self.values = np.full((len(self.columns), len(self.index)), np.nan, dtype=COMPACT_DTYPE)
+        self.tz = None
+        _retain(self, self.values)
+
+    @classmethod
+    def from_dataframe(cls, df, columns=None):
+        """DataFrame の指定列を取り込む（インデックスは UNIX秒に変換）"""
+        columns = list(df.columns if columns is None else columns)
+        frame = cls(epoch_seconds(df.index), columns)
+        for name in columns:
+            frame.values[frame._positions[name]] = df[name].to_numpy()
+        frame.tz = getattr(df.index, 'tz', None)
+        return frame
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, name):
+        """列（ブロック上のビュー）"""
+        return self.values[self._positions[name]]
+
+    def __setitem__(self, name, value):
+        self.values[self._positions[name]] = value
+
+    @property
+    def nbytes(self):
+        """列ブロックのバイト数（共有インデックスは含まない）"""
+        return self.values.nbytes
+
+    def datetime_index(self):
+        """共有の DatetimeIndex（タイムゾーンなしの場合は時刻配列上のビュー）"""
+        key = (self._digest, str(self.tz))
+        with _index_lock:
+            index = _datetime_indexes.get(key)
+        if index is None:
+            index = pd.DatetimeIndex(self.index.view('datetime64[s]'), copy=False)
+            if self.tz is not None:
+                index = index.tz_localize('UTC').tz_convert(self.tz)
+            with _index_lock:
+                index = _datetime_indexes.setdefault(key, index)
+        return index
+
+    def to_dataframe(self):
+        """列ブロック・インデックスを共有したままの DataFrame（描画・既存コード向け）
+
+        フレーム自体を破棄しても、DataFrame が生存している間はブロックを計上し続ける。
+        """
+        df = pd.DataFrame(self.values.T, index=self.datetime_index(), columns=self.columns, copy=False)
+        if np.shares_memory(df.values, self.values):
+            _retain(df, self.values)
+        return df
+
+
+def pct_change(x, out=None):
+    """x[t] / x[t-1] - 1（先頭は NaN）を out に書き込む"""
+    x = np.asarray(x)
+    if out is None:
+        out = np.empty(len(x), dtype=np.result_type(x.dtype, COMPACT_DTYPE))
+    if len(x) == 0:
+        return out
+    out[0] = np.nan
+    np.divide(x[1:], x[:-1], out=out[1:])
+    out[1:] -= 1
+    return out
+
+
+def _nan_windows(x, window):
+    """NaN を含む窓（移動計算の出力位置 window-1 以降に対応）"""
+    bad = ~np.isfinite(x)
+    if not bad.any():
+        return None
+    return _window_sums(bad, window) > 0
+
+
+def _window_sums(x, window):
+    """長さ window の移動和（float64 の累積和1本だけを作業領域に使う）"""
+    csum = np.empty(len(x) + 1, dtype=np.float64)
+    csum[0] = 0.0
+    np.cumsum(x, out=csum[1:])
+    return csum[window:] - csum[:-window]
+
+
+def rolling_mean(x, window, out=None):
+    """移動平均（最初の window-1 本は NaN）"""
+    x = np.asarray(x)
+    if out is None:
+        out = np.empty(len(x), dtype=np.result_type(x.dtype, COMPACT_DTYPE))
+    out[:window - 1] = np.nan
+    if len(x) < window:
+        return out
+    bad = _nan_windows(x, window)
+    sums = _window_sums(np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0) if bad is not None else x, window)
+    if bad is not None:
+        sums[bad] = np.nan
+    np.divide(sums, window, out=out[window - 1:], casting='unsafe')
+    return out
+
+
+def rolling_std(x, window, ddof=1, out=None):
+    """移動標準偏差（NaN を含む窓は NaN。pandas の rolling().std() と同じ扱い）"""
+    x = np.asarray(x)
+    if out is None:
+        out = np.empty(len(x), dtype=np.result_type(x.dtype, COMPACT_DTYPE))
+    out[:window - 1] = np.nan
+    if len(x) < window:
+        return out
+
+    finite = np.isfinite(x)
+    clean = np.where(finite, x, 0.0)
+    # 桁落ちを避けるため全体の平均をずらしてから二乗和を取る
+    shift = float(clean[finite].mean()) if finite.any() else 0.0
+    clean -= shift
+    clean[~finite] = 0.0
+    sums = _window_sums(clean, window)
+    sq = _window_sums(np.square(clean, out=clean), window)
+    var = (sq - sums * sums / window) / (window - ddof)
+    np.maximum(var, 0.0, out=var)
+    bad = _nan_windows(x, window)
+    if bad is not None:
+        var[bad] = np.nan
+    np.sqrt(var, out=out[window - 1:], casting='unsafe')
+    return out
+
+
+def frames_nbytes():
+    """生存中の列ブロック（フレーム・共有 DataFrame が保持しているもの）と共有インデックスのバイト数"""
+    with _block_lock:
+        blocks = [nbytes for nbytes, _ in _blocks.values()]
+    with _index_lock:
+        # タイムゾーンなしの DatetimeIndex は時刻配列のビューなので二重に数えない
+        index_bytes = sum(index.nbytes for index in _indexes.values())
+        index_bytes += sum(index.nbytes for index in _datetime_indexes.values() if index.tz is not None)
+    return {
+        'frames': len(blocks),
+        'values': int(sum(blocks)),
+        'indexes': int(index_bytes),
+    }
+
+
+def process_memory():
+    """プロセスの現在・最大 RSS（バイト、取得できない場合は None）"""
+    rss = None
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        try:
+            import psutil
+            rss = psutil.Process().memory_info().rss
+        except Exception:
+            pass
+
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux は KB、macOS はバイト
+        peak = peak if sys.platform == 'darwin' else peak * 1024
+    return {'rss': rss, 'peak_rss': peak}
+
+
+class MemoryAccounting:
+    """コンポーネントごとの保持メモリ（バイト数を返す関数を登録）"""
+
+    def __init__(self):
+        self._components = {}
+
+    def register(self, name, func):
+        self._components[name] = func
+
+    def report(self):
+        components = {}
+        for name, func in self._components.items():
+            try:
+                components[name] = int(func())
+            except Exception:
+                components[name] = None
+        tracked = sum(v for v in components.values() if v)
+        return dict(process_memory(), components=components, tracked=tracked)
@@ -0,0 +1,125 @@
+"""
+通貨ペア間の相関行列とボラティリティ局面
+
+全ペアの共通バーごとにリターンベクトルを作り、指数加重の平均・共分散を
+ランク1更新（C ← λ(C + (1-λ)ddᵀ)）で逐次更新する。履歴全体からの再計算は行わず、
+新しく届いたバーだけを取り込む。ペアごとの短期・長期の分散比から局面（low / normal / high）を判定する。
+"""
+
+import threading
+
+import numpy as np
+
+from risk_simulator import REGIME_BOUNDS, REGIME_LONG, REGIME_SHORT, REGIMES
+
+
+def _decay(window):
+    """ウィンドウ長（バー数）を指数加重の減衰率に変換（平均滞留期間が同じになる値）"""
+    return 1.0 - 2.0 / (window + 1.0)
+
+
+class StreamingCorrelation:
+    """複数ペアのリターン相関・ボラティリティの逐次推定"""
+
+    def __init__(self, pairs, window=100, short_window=REGIME_SHORT, long_window=REGIME_LONG):
+        self.pairs = list(pairs)
+        self.window = window
+        n = len(self.pairs)
+        self._lambda = _decay(window)
+        self._lambda_short = _decay(short_window)
+        self._lambda_long = _decay(long_window)
+        self._lock = threading.Lock()
+
+        self.mean = np.zeros(n)
+        self.cov = np.zeros((n, n))
+        self.var_short = np.zeros(n)
+        self.var_long = np.zeros(n)
+        self.count = 0
+        self.last_time = None
+        self._last_close = None
+
+    def push(self, returns):
+        """1本分のリターンベクトルで平均・共分散を更新（O(ペア数²)）"""
+        lam = self._lambda
+        d = returns - self.mean
+        self.mean += (1.0 - lam) * d
+        self.cov += (1.0 - lam) * np.outer(d, d)
+        self.cov *= lam
+
+        # 局面判定用の分散（平均0とみなした短期・長期の指数加重）
+        sq = returns * returns
+        self.var_short += (1.0 - self._lambda_short) * (sq - self.var_short)
+        self.var_long += (1.0 - self._lambda_long) * (sq - self.var_long)
+        self.count += 1
+
+    def update(self, series):
+        """各ペアの (バー時刻, 終値) から未処理の共通バーだけを取り込む
+
+        Args:
+            series: {pair: (times, closes)}（全ペア分が必要）
+
+        Returns:
+            int: 取り込んだバー数
+        """
+        with self._lock:
+            arrays = [(np.asarray(series[p][0], dtype=np.int64),
+                       np.asarray(series[p][1], dtype=np.float64)) for p in self.pairs]
+
+            # 全ペアにそろっている確定済みの時刻（各ペアの最新バーは形成中とみなす）のうち未処理のもの
+            common = None
+            for times, _ in arrays:
+                fresh = times[:-1] if self.last_time is None else times[:-1][times[:-1] > self.last_time]
+                common = fresh if common is None else np.intersect1d(common, fresh, assume_unique=True)
+            if common is None or len(common) == 0:
+                return 0
+
+            closes = np.empty((len(common), len(self.pairs)))
+            for j, (times, values) in enumerate(arrays):
+                closes[:, j] = values[np.searchsorted(times, common)]
+
+            start = 0
+            if self._last_close is None:
+                self._last_close = closes[0]
+                start = 1
+            added = 0
+            for row in closes[start:]:
+                returns = row / self._last_close - 1.0
+                if np.all(np.isfinite(returns)):
+                    self.push(returns)
+                    added += 1
+                    self._last_close = row
+            self.last_time = int(common[-1])
+            return added
+
+    def correlation(self):
+        """相関行列（分散0のペアは NaN）"""
+        std = np.sqrt(np.diag(self.cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.cov / np.outer(std, std)
+        np.clip(corr, -1.0, 1.0, out=corr)
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return corr
+
+    def regimes(self):
+        """ペアごとの (局面名, 短期/長期の標準偏差比)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(self.var_long > 0, np.sqrt(self.var_short / self.var_long), 1.0)
+        labels = np.searchsorted(REGIME_BOUNDS, ratio, side='right')
+        return [(REGIMES[i], float(r)) for i, r in zip(labels, ratio)]
+
+    def snapshot(self):
+        """ダッシュボード用のJSON化可能な辞書"""
+        with self._lock:
+            corr = self.correlation()
+            regimes = self.regimes()
+            volatility = np.sqrt(np.diag(self.cov)) * 100
+        return {
+            'pairs': self.pairs,
+            'window': self.window,
+            'bars': self.count,
+            'last_time': self.last_time,
+            'correlation': [[None if np.isnan(v) else round(float(v), 3) for v in row] for row in corr],
+            'volatility': [round(float(v), 4) for v in volatility],
+            'regime': [label for label, _ in regimes],
+            'volatility_ratio': [round(r, 3) for _, r in regimes],
+        }
@@ -0,0 +1,330 @@
+"""
+取引ログ検索インデックス
+
+logs/*.log の各行を転置インデックス（トークン・レベル・通貨ペア・モデル）と
+日単位の時間バケットに登録する。ファイルごとに読み込み済みバイト位置を保持し、
+追記された行だけを取り込むため再構築は不要。
+本文はメモリに持たず (ファイル, オフセット, 長さ) で参照し、ヒットした行だけ読み出す。
+"""
+
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from datetime import datetime
+
+import numpy as np
+
+ASCII_TOKEN = re.compile(r'[A-Za-z0-9_]+')
+CJK_RUN = re.compile(r'[぀-ヿ㐀-鿿ｦ-ﾟ]+')
+LEVEL_PATTERN = re.compile(r'\b(DEBUG|INFO|WARNING|ERROR|CRITICAL)\b')
+PAIR_PATTERN = re.compile(r'\b([A-Z]{3}/[A-Z]{3})\b')
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+BUCKET_SECONDS = 86400
+
+INDEX_VERSION = 2
+
+
+def tokenize(text, query=False):
+    """英数字は小文字の単語、日本語は文字bigramに分割
+
+    索引側は1文字検索（例: q=買）にも対応できるよう各文字のunigramも登録する。
+    検索語側（query=True）は2文字以上ならbigramだけを使う。
+    """
+    tokens = [t.lower() for t in ASCII_TOKEN.findall(text)]
+    for run in CJK_RUN.findall(text):
+        if len(run) == 1 or not query:
+            tokens.extend(run)
+        if len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def model_for_path(path):
+    """ログファイル名からモデル種別を判定"""
+    name = os.path.basename(path)
+    if name.startswith('adaptive'):
+        return 'adaptive'
+    if name.startswith('demo'):
+        return 'fixed'
+    return 'other'
+
+
+def is_trade_line(line):
+    """取引行の判定（従来の抽出条件と同じ）"""
+    return '取引実行' in line or 'TRADE' in line.upper()
+
+
+def query_words(q):
+    """検索語を空白で分割して小文字化
+
+    索引語を1つも含まない語（例: '-'）は候補を絞り込めず全行の読み込みになるため ValueError。
+    """
+    words = [w.lower() for w in (q or '').split()]
+    for word in words:
+        if not tokenize(word, query=True):
+            raise ValueError(f'検索できない語です（英数字または日本語を含めてください）: {word}')
+    return words
+
+
+def parse_time(value):
+    """'YYYY-MM-DD[ HH:MM[:SS]]' をUNIX秒に変換（ログと同じローカル時刻）"""
+    if value is None or value == '':
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+class LogIndex:
+    """追記型ログファイルの転置インデックス"""
+
+    def __init__(self, path=None, save_interval=60):
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._dirty = False
+        self._reset()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _reset(self):
+        self.files = []           # [{'path', 'offset', 'dead', 'model'}]
+        self._live = {}           # path -> file id
+        self.doc_ts = array('d')
+        self.doc_file = array('I')
+        self.doc_offset = array('Q')
+        self.doc_len = array('I')
+        self.postings = {}        # token -> array('I') (doc id 昇順)
+        self.buckets = {}         # 日番号 -> array('I')
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != INDEX_VERSION:
+                return
+            for name in ('files', '_live', 'doc_ts', 'doc_file', 'doc_offset',
+                         'doc_len', 'postings', 'buckets'):
+                setattr(self, name, state[name])
+        except Exception:
+            self._reset()
+
+    def save(self):
+        """インデックスをディスクへ保存"""
+        if not self.path:
+            return
+        with self._lock:
+            state = {
+                'version': INDEX_VERSION,
+                'files': self.files, '_live': self._live,
+                'doc_ts': self.doc_ts, 'doc_file': self.doc_file,
+                'doc_offset': self.doc_offset, 'doc_len': self.doc_len,
+                'postings': self.postings, 'buckets': self.buckets,
+            }
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._last_save = time.time()
+
+    def __len__(self):
+        return len(self.doc_ts)
+
+    def nbytes(self):
+        """行メタデータ・転置リスト・時間バケットのバイト数（辞書のオーバーヘッドは含まない）"""
+        with self._lock:
+            size = sum(a.itemsize * len(a) for a in
+                       (self.doc_ts, self.doc_file, self.doc_offset, self.doc_len))
+            size += sum(p.itemsize * len(p) for p in self.postings.values())
+            size += sum(b.itemsize * len(b) for b in self.buckets.values())
+        return size
+
+    def refresh(self, paths):
+        """ファイル群の追記分を取り込む
+
+        Returns:
+            int: 追加した行数
+        """
+        added = 0
+        with self._lock:
+            for path in paths:
+                added += self._ingest_file(path)
+            if added:
+                self._dirty = True
+        if self._dirty and time.time() - self._last_save >= self.save_interval:
+            self.save()
+        return added
+
+    def _ingest_file(self, path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return 0
+
+        file_id = self._live.get(path)
+        if file_id is not None and size < self.files[file_id]['offset']:
+            # ローテーション・切り詰め: 旧ファイルの行は参照不能として扱う
+            self.files[file_id]['dead'] = True
+            file_id = None
+        if file_id is None:
+            file_id = len(self.files)
+            self.files.append({'path': path, 'offset': 0, 'dead': False,
+                               'model': model_for_path(path)})
+            self._live[path] = file_id
+
+        entry = self.files[file_id]
+        if size == entry['offset']:
+            return 0
+
+        with open(path, 'rb') as f:
+            f.seek(entry['offset'])
+            chunk = f.read(size - entry['offset'])
+
+        # 書き込み途中の最終行は次回に回す
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return 0
+
+        offset = entry['offset']
+        last_ts = self.doc_ts[-1] if len(self.doc_ts) else os.path.getmtime(path)
+        count = 0
+        for raw in chunk[:end].splitlines(keepends=True):
+            line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+            if line.strip():
+                last_ts = self._add_line(line, file_id, offset, len(raw), entry['model'], last_ts)
+                count += 1
+            offset += len(raw)
+
+        entry['offset'] = offset
+        return count
+
+    def _add_line(self, line, file_id, offset, length, model, last_ts):
+        try:
+            ts = datetime.strptime(line[:19], TIMESTAMP_FORMAT).timestamp()
+            body = line[23:]
+        except ValueError:
+            ts = last_ts  # トレースバック等の継続行は直前の時刻
+            body = line
+
+        doc = len(self.doc_ts)
+        self.doc_ts.append(ts)
+        self.doc_file.append(file_id)
+        self.doc_offset.append(offset)
+        self.doc_len.append(length)
+
+        terms = set(tokenize(body))
+        level = LEVEL_PATTERN.search(line)
+        if level:
+            terms.add('level:' + level.group(1))
+        terms.update('pair:' + p for p in PAIR_PATTERN.findall(line))
+        terms.add('model:' + model)
+        if is_trade_line(line):
+            terms.add('kind:trade')
+
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = array('I')
+            postings.append(doc)
+
+        bucket = int(ts // BUCKET_SECONDS)
+        if bucket not in self.buckets:
+            self.buckets[bucket] = array('I')
+        self.buckets[bucket].append(doc)
+        return ts
+
+    def search(self, q=None, start=None, end=None, level=None, pair=None,
+               model=None, kind=None, limit=20):
+        """条件に一致する行を新しい順に返す
+
+        Args:
+            q: 検索語（空白区切りはAND）
+            start, end: UNIX秒（end は含まない）
+            level, pair, model, kind: フィールド条件
+
+        Returns:
+            list: [{'ts', 'line', 'file', 'model'}]
+        """
+        words = query_words(q)
+        terms = [t for w in words for t in tokenize(w, query=True)]
+        for field, value in (('level', level), ('pair', pair), ('model', model), ('kind', kind)):
+            if value:
+                terms.append(f'{field}:{value.upper() if field == "level" else value}')
+
+        with self._lock:
+            ordered = self._match(set(terms), start, end)
+
+        results = []
+        handles = {}
+        try:
+            for doc in ordered:
+                entry = self.files[self.doc_file[doc]]
+                f = handles.get(entry['path'])
+                if f is None:
+                    f = handles[entry['path']] = open(entry['path'], 'rb')
+                f.seek(self.doc_offset[doc])
+                line = f.read(self.doc_len[doc]).decode('utf-8', errors='replace').rstrip('\r\n')
+                # bigram の偶然一致を除外するため原文で確認
+                lowered = line.lower()
+                if all(w in lowered for w in words):
+                    results.append({'ts': self.doc_ts[doc], 'line': line,
+                                    'file': entry['path'], 'model': entry['model']})
+                    if len(results) >= limit:
+                        break
+        finally:
+            for f in handles.values():
+                f.close()
+        return results
+
+    def _match(self, terms, start, end):
+        """条件に一致する doc id を新しい順で返す（ロック内で呼ぶ）
+
+        array への numpy ビューは追記を妨げるため、ここで作ったビューは
+        関数内で破棄し、戻り値はコピーのみとする。
+        """
+        empty = np.empty(0, dtype=np.uint32)
+        lists = []
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                return empty
+            lists.append(np.frombuffer(postings, dtype=np.uint32))
+
+        if start is not None or end is not None:
+            first = int(start // BUCKET_SECONDS) if start is not None else min(self.buckets, default=0)
+            last = int(end // BUCKET_SECONDS) if end is not None else max(self.buckets, default=0)
+            in_range = [self.buckets[b] for b in range(first, last + 1) if b in self.buckets]
+            if not in_range:
+                return empty
+            lists.append(np.sort(np.concatenate([np.frombuffer(b, dtype=np.uint32) for b in in_range])))
+
+        # 短いリストから順に積集合
+        lists.sort(key=len)
+        if lists:
+            candidates = lists[0].copy()
+            for postings in lists[1:]:
+                candidates = np.intersect1d(candidates, postings, assume_unique=True)
+                if len(candidates) == 0:
+                    return empty
+        else:
+            candidates = np.arange(len(self.doc_ts), dtype=np.uint32)
+        del lists
+
+        ts = np.frombuffer(self.doc_ts, dtype=np.float64)[candidates]
+        mask = np.ones(len(candidates), dtype=bool)
+        if start is not None:
+            mask &= ts >= start
+        if end is not None:
+            mask &= ts < end
+        dead = np.array([f['dead'] for f in self.files], dtype=bool)
+        if dead.any():
+            mask &= ~dead[np.frombuffer(self.doc_file, dtype=np.uint32)[candidates]]
+        candidates, ts = candidates[mask], ts[mask]
+
+        # 新しい順（同時刻は後に書かれた行を優先）
+        return candidates[np.lexsort((-candidates.astype(np.int64), -ts))]
@@ -0,0 +1,168 @@
+"""
+マルチタイムフレームOHLCピラミッド
+
+ベースフィードのバーを 1m → 5m → 15m → 1h → 4h → 1d へ逐次集約して保持する。
+各タイムフレームは「確定済みバー」と「形成中バー」を持ち、新しいバーが届くたびに
+下位足の形成中バーを上位足へ伝播するだけなので、1バーあたりの更新は O(タイムフレーム数)。
+統計・チャートはタイムフレームを明示して集約済みバーを取得する。
+"""
+
+import threading
+import numpy as np
+
+# タイムフレーム -> 秒数（昇順）
+TIMEFRAMES = {
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '1h': 3600,
+    '4h': 14400,
+    '1d': 86400,
+}
+
+# (open, high, low, close) 列の位置
+O, H, L, C = range(4)
+
+
+def infer_timeframe(bar_times):
+    """バー時刻（UNIX秒）の間隔からベースタイムフレームを推定"""
+    if len(bar_times) < 2:
+        return '1m'
+    step = float(np.median(np.diff(bar_times)))
+    for name, seconds in TIMEFRAMES.items():
+        if step <= seconds * 1.5:
+            return name
+    return '1d'
+
+
+def _merge(agg, bar):
+    """OHLCを結合（agg が先、bar が後）"""
+    if agg is None:
+        return bar.copy()
+    return np.array([agg[O], max(agg[H], bar[H]), min(agg[L], bar[L]), bar[C]], dtype=agg.dtype)
+
+
+class _Level:
+    """1つのタイムフレームの確定済みバー（可変長配列）と形成中バー"""
+
+    def __init__(self, seconds, max_bars, dtype=np.float64):
+        self.seconds = seconds
+        self.max_bars = max_bars
+        self.times = np.empty(max_bars * 2, dtype=np.int64)
+        self.ohlc = np.empty((max_bars * 2, 4), dtype=dtype)
+        self.count = 0
+        self.current_start = None
+        self.current = None
+        self._closed_agg = None  # 形成中バーのうち下位足で確定済みの部分
+
+    def _append(self, start, bar):
+        if self.count == len(self.times):
+            # 古い半分を捨てる（償却 O(1)）
+            keep = self.max_bars
+            self.times[:keep] = self.times[self.count - keep:self.count]
+            self.ohlc[:keep] = self.ohlc[self.count - keep:self.count]
+            self.count = keep
+        self.times[self.count] = start
+        self.ohlc[self.count] = bar
+        self.count += 1
+
+    def advance(self, child_closed, child_start, child_current):
+        """下位足の更新を反映し、(確定したバー, 形成中バー開始時刻, 形成中バー) を返す"""
+        if child_closed is not None:
+            self._closed_agg = _merge(self._closed_agg, child_closed)
+
+        closed = None
+        bucket = child_start - child_start % self.seconds
+        if bucket != self.current_start:
+            if self.current_start is not None and self._closed_agg is not None:
+                closed = self._closed_agg
+                self._append(self.current_start, closed)
+            self._closed_agg = None
+            self.current_start = bucket
+
+        self.current = _merge(self._closed_agg, child_current)
+        return closed, self.current_start, self.current
+
+    def window(self, count, include_current=True):
+        """直近 count 本（形成中バーを含む）"""
+        closed_count = count - 1 if include_current and self.current is not None else count
+        start = max(self.count - closed_count, 0)
+        times = self.times[start:self.count]
+        ohlc = self.ohlc[start:self.count]
+        if include_current and self.current is not None:
+            times = np.append(times, self.current_start)
+            ohlc = np.vstack([ohlc, self.current])
+        return times, ohlc
+
+
+class OHLCPyramid:
+    """ベースフィードから上位タイムフレームを逐次集約"""
+
+    def __init__(self, base='1m', max_bars=5000, dtype=np.float64):
+        if base not in TIMEFRAMES:
+            raise ValueError(f'未対応のタイムフレーム: {base}')
+        self.base = base
+        names = list(TIMEFRAMES)
+        self.timeframes = names[names.index(base):]
+        self.dtype = np.dtype(dtype)
+        self._levels = {tf: _Level(TIMEFRAMES[tf], max_bars, self.dtype) for tf in self.timeframes}
+        self._lock = threading.Lock()
+        self._last_time = None
+        self._last_bar = None
+
+    @property
+    def last_time(self):
+        return self._last_time
+
+    @property
+    def nbytes(self):
+        """全タイムフレームのバー配列のバイト数"""
+        return sum(level.times.nbytes + level.ohlc.nbytes for level in self._levels.values())
+
+    def push(self, bar_time, o, h, l, c):
+        """ベースフィードのバーを1本追加（同時刻のバーは形成中バーの更新として扱う）"""
+        bar_time = int(bar_time)
+        bar = np.array([o, h, l, c], dtype=self.dtype)
+        with self._lock:
+            if self._last_time is not None and bar_time < self._last_time:
+                return False  # 古いバーは無視
+            closed = self._last_bar if self._last_time is not None and bar_time > self._last_time else None
+            self._last_time, self._last_bar = bar_time, bar
+
+            start, current = bar_time, bar
+            for tf in self.timeframes:
+                closed, start, current = self._levels[tf].advance(closed, start, current)
+            return True
+
+    def update(self, bar_times, opens, highs, lows, closes):
+        """配列でまとめて追加（最終時刻より前のバーは読み飛ばす）
+
+        Returns:
+            int: 取り込んだバー数
+        """
+        bar_times = np.asarray(bar_times, dtype=np.int64)
+        first = 0
+        if self._last_time is not None:
+            first = int(np.searchsorted(bar_times, self._last_time, side='left'))
+        for i in range(first, len(bar_times)):
+            self.push(bar_times[i], opens[i], highs[i], lows[i], closes[i])
+        return len(bar_times) - first
+
+    def bars(self, timeframe, count, include_current=True):
+        """集約済みバーを取得
+
+        Returns:
+            dict: {'time', 'open', 'high', 'low', 'close'} の配列
+        """
+        if timeframe not in self._levels:
+            raise ValueError(f'タイムフレーム {timeframe} はベース {self.base} より細かいか未対応です')
+        with self._lock:
+            times, ohlc = self._levels[timeframe].window(count, include_current)
+            times, ohlc = times.copy(), ohlc.copy()
+        return {
+            'time': times,
+            'open': ohlc[:, O],
+            'high': ohlc[:, H],
+            'low': ohlc[:, L],
+            'close': ohlc[:, C],
+        }
@@ -0,0 +1,258 @@
+"""
+予測台帳（Prediction Ledger）
+
+固定モデル・適応学習モデルが出したシグナルを固定長バイナリレコードで
+ディスクに追記し、後続バー到着時にまとめて（ベクトル化して）結果判定する。
+精度・較正はモデル別・ウィンドウ別に集計し、台帳が更新されるまでキャッシュする。
+"""
+
+import os
+import threading
+import numpy as np
+
+from shared_cache import FileLock
+
+# モデル名 <-> コード
+MODELS = ('fixed', 'adaptive')
+
+# 1レコード = 48バイト（固定長なので memmap でそのまま読み書きできる）
+LEDGER_DTYPE = np.dtype([
+    ('timestamp', '<i8'),        # シグナル対象バーの時刻（UNIX秒）
+    ('pair', 'S8'),              # 通貨ペア（例: b'USD/JPY'）
+    ('model', 'u1'),             # MODELS のインデックス
+    ('direction', 'i1'),         # +1: 上昇, -1: 下降
+    ('outcome', 'i1'),           # -1: 未確定, 0: 不正解, 1: 正解
+    ('_pad', 'u1'),
+    ('confidence', '<f4'),
+    ('expected_return', '<f4'),
+    ('entry_price', '<f8'),
+    ('realized_return', '<f4'),
+    ('_pad2', 'u4'),
+])
+
+UNRESOLVED = -1
+
+# デフォルトの集計ウィンドウ（直近N件の確定シグナル）
+DEFAULT_WINDOWS = (50, 200, 1000)
+
+# 較正ビン（信頼度）
+CALIBRATION_BINS = np.array([0.0, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0 + 1e-9])
+
+
+class PredictionLedger:
+    """シグナル台帳（追記専用ファイル + 未確定区間のみを走査する結果判定）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # 複数ワーカープロセスからの書き込みを排他
+        self._file_lock = FileLock(path + '.lock')
+        self._stats_cache = {}
+        # これより前のレコードはすべて確定済み
+        self._resolve_from = 0
+        # (model, pair) -> 最後に記録したバー時刻（同一バーの重複記録防止）
+        self._last_recorded = {}
+        self._known_count = 0
+        self._sync()
+
+    def _sync(self):
+        """他プロセスが追記したレコードから重複防止用の状態を更新"""
+        records = self._read()
+        new = records[self._known_count:]
+        if len(new) == 0:
+            return
+        for code, model in enumerate(MODELS):
+            for pair in np.unique(new['pair']):
+                mask = (new['model'] == code) & (new['pair'] == pair)
+                if mask.any():
+                    key = (model, bytes(pair))
+                    latest = int(new['timestamp'][mask].max())
+                    self._last_recorded[key] = max(self._last_recorded.get(key, -1), latest)
+        if self._known_count == 0:
+            unresolved = np.flatnonzero(records['outcome'] == UNRESOLVED)
+            self._resolve_from = int(unresolved[0]) if len(unresolved) else len(records)
+        self._known_count = len(records)
+
+    def _disk_version(self):
+        """台帳ファイルの更新を検知するためのバージョン（サイズ, 更新時刻）"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return (0, 0)
+        return (st.st_size, st.st_mtime_ns)
+
+    def _read(self, mode='r'):
+        """台帳全体を memmap として返す（空なら空配列）"""
+        if not os.path.exists(self.path):
+            return np.empty(0, dtype=LEDGER_DTYPE)
+        count = os.path.getsize(self.path) // LEDGER_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=LEDGER_DTYPE)
+        return np.memmap(self.path, dtype=LEDGER_DTYPE, mode=mode, shape=(count,))
+
+    def records(self):
+        """台帳全体（読み取り専用の memmap）"""
+        return self._read()
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // LEDGER_DTYPE.itemsize
+
+    def append(self, model, pair, signal, bar_time, entry_price):
+        """シグナルを1件追記（同一モデル・ペア・バーの再記録はスキップ）
+
+        Returns:
+            bool: 追記した場合 True
+        """
+        key = (model, pair.encode('ascii'))
+        bar_time = int(bar_time)
+        with self._lock, self._file_lock:
+            self._sync()
+            if self._last_recorded.get(key, -1) >= bar_time:
+                return False
+
+            record = np.zeros(1, dtype=LEDGER_DTYPE)
+            record['timestamp'] = bar_time
+            record['pair'] = key[1]
+            record['model'] = MODELS.index(model)
+            record['direction'] = 1 if signal['direction'] == 1 else -1
+            record['outcome'] = UNRESOLVED
+            record['confidence'] = signal['confidence']
+            record['expected_return'] = signal['expected_return']
+            record['entry_price'] = entry_price
+            record['realized_return'] = np.nan
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'ab') as f:
+                f.write(record.tobytes())
+
+            self._last_recorded[key] = bar_time
+            self._known_count += 1
+            return True
+
+    def resolve(self, pair, bar_times, closes):
+        """未確定シグナルを次バーの終値でまとめて判定（次バーが確定してから判定する）
+
+        Args:
+            pair: 通貨ペア
+            bar_times: バー時刻（UNIX秒、昇順）
+            closes: 各バーの終値
+
+        Returns:
+            int: 今回確定したシグナル数
+        """
+        bar_times = np.asarray(bar_times, dtype=np.int64)
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(bar_times) == 0:
+            return 0
+
+        with self._lock, self._file_lock:
+            records = self._read(mode='r+')
+            if len(records) <= self._resolve_from:
+                return 0
+
+            tail = records[self._resolve_from:]
+            pending = (tail['outcome'] == UNRESOLVED) & (tail['pair'] == pair.encode('ascii'))
+            idx = np.flatnonzero(pending)
+            if len(idx) == 0:
+                self._advance_watermark(records)
+                return 0
+
+            # シグナル時刻の次のバーを探索（最新バーは形成中のため、確定済みのバーだけで判定）
+            exit_pos = np.searchsorted(bar_times, tail['timestamp'][idx], side='right')
+            ready = exit_pos < len(bar_times) - 1
+            idx, exit_pos = idx[ready], exit_pos[ready]
+            if len(idx) == 0:
+                return 0
+
+            entry = tail['entry_price'][idx]
+            realized = closes[exit_pos] / entry - 1.0
+            hit = np.sign(realized) == tail['direction'][idx]
+
+            tail['realized_return'][idx] = realized * 100
+            tail['outcome'][idx] = hit.astype(np.int8)
+            records.flush()
+
+            self._advance_watermark(records)
+            return int(len(idx))
+
+    def _advance_watermark(self, records):
+        """先頭側の確定済み区間を飛ばす"""
+        unresolved = np.flatnonzero(records['outcome'][self._resolve_from:] == UNRESOLVED)
+        self._resolve_from += int(unresolved[0]) if len(unresolved) else len(records) - self._resolve_from
+
+    def stats(self, windows=DEFAULT_WINDOWS):
+        """モデル別・ウィンドウ別の精度と較正
+
+        Returns:
+            dict: {model: {'total': {...}, 'windows': {N: {..., 'calibration': {...}}}, 'calibration': {...}}}
+        """
+        windows = tuple(windows)
+        with self._lock:
+            version = self._disk_version()
+            cached = self._stats_cache.get(windows)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            records = self._read()
+            resolved = records[records['outcome'] != UNRESOLVED] if len(records) else records
+
+            result = {}
+            for code, model in enumerate(MODELS):
+                rows = resolved[resolved['model'] == code] if len(resolved) else resolved
+                outcome = np.asarray(rows['outcome'], dtype=np.float64)
+                confidence = np.asarray(rows['confidence'], dtype=np.float64)
+                result[model] = {
+                    'total': _accuracy(outcome, confidence),
+                    'windows': {n: dict(_accuracy(outcome[-n:], confidence[-n:]),
+                                        calibration=_calibration(outcome[-n:], confidence[-n:]))
+                                for n in windows},
+                    'calibration': _calibration(outcome, confidence),
+                    'pending': int(np.count_nonzero(
+                        (records['model'] == code) & (records['outcome'] == UNRESOLVED)
+                    )) if len(records) else 0,
+                }
+
+            self._stats_cache[windows] = (version, result)
+            return result
+
+
+def _accuracy(outcome, confidence):
+    """的中率・平均信頼度・Brierスコア"""
+    n = len(outcome)
+    if n == 0:
+        return {'count': 0, 'accuracy': None, 'mean_confidence': None, 'brier': None}
+    return {
+        'count': int(n),
+        'accuracy': float(outcome.mean()),
+        'mean_confidence': float(confidence.mean()),
+        'brier': float(np.mean((confidence - outcome) ** 2)),
+    }
+
+
+def _calibration(outcome, confidence):
+    """信頼度ビンごとの平均信頼度と実際の的中率、および ECE"""
+    if len(outcome) == 0:
+        return {'bins': [], 'ece': None}
+
+    bin_idx = np.digitize(confidence, CALIBRATION_BINS) - 1
+    nbins = len(CALIBRATION_BINS) - 1
+    counts = np.bincount(bin_idx, minlength=nbins)[:nbins]
+    hit_sum = np.bincount(bin_idx, weights=outcome, minlength=nbins)[:nbins]
+    conf_sum = np.bincount(bin_idx, weights=confidence, minlength=nbins)[:nbins]
+
+    bins = []
+    ece = 0.0
+    for i in np.flatnonzero(counts):
+        hit_rate = hit_sum[i] / counts[i]
+        mean_conf = conf_sum[i] / counts[i]
+        ece += counts[i] / len(outcome) * abs(hit_rate - mean_conf)
+        bins.append({
+            'lower': float(CALIBRATION_BINS[i]),
+            'upper': float(min(CALIBRATION_BINS[i + 1], 1.0)),
+            'count': int(counts[i]),
+            'mean_confidence': float(mean_conf),
+            'accuracy': float(hit_rate),
+        })
+    return {'bins': bins, 'ece': float(ece)}
@@ -0,0 +1,171 @@
+"""
+モンテカルロ・リスクシミュレーター
+
+直近の市場リターンをブートストラップし、現在のサイズ設定（Kelly分数 × レバレッジ）で
+多数の資産曲線を NumPy でまとめて生成する。パスはメモリ上限に収まるチャンク単位で
+生成し、パスごとの最終資産・最大ドローダウン・破産判定だけを保持する。
+結果はサイズ設定とボラティリティ局面が変わるまでキャッシュする。
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ボラティリティ局面の判定（短期 / 長期の標準偏差比）
+REGIME_SHORT = 20
+REGIME_LONG = 100
+REGIME_BOUNDS = (0.8, 1.25)  # これ未満: low, これ以上: high
+REGIMES = ('low', 'normal', 'high')
+
+DRAWDOWN_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+TERMINAL_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# 1パス・1ステップあたりの作業配列（乱数インデックス・符号・リターン・資産曲線）
+BYTES_PER_STEP = 8 * 4
+
+
+def volatility_regime(returns):
+    """直近のボラティリティ局面を判定
+
+    Returns:
+        tuple: (局面名, 短期/長期の標準偏差比)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) < REGIME_SHORT + 1:
+        return 'normal', 1.0
+    short = returns[-REGIME_SHORT:].std(ddof=1)
+    long = returns[-REGIME_LONG:].std(ddof=1)
+    ratio = float(short / long) if long > 0 else 1.0
+    return REGIMES[int(np.searchsorted(REGIME_BOUNDS, ratio, side='right'))], ratio
+
+
+def simulate(returns, exposure, n_paths=20000, horizon=250, win_rate=None,
+             ruin_level=0.5, memory_mb=64, seed=None):
+    """資産曲線を生成してリスク指標を集計
+
+    Args:
+        returns: 直近のバーリターン（ブートストラップ元）
+        exposure: 1取引あたりの資金に対する建玉比率（Kelly分数 × レバレッジ）
+        n_paths: パス数
+        horizon: 1パスの取引回数
+        win_rate: 方向的中率（None の場合はリターンの符号をそのまま使う）
+        ruin_level: 初期資産に対してこの比率を下回ったら破産とみなす
+        memory_mb: 作業配列のメモリ上限（MB）
+
+    Returns:
+        dict: ruin_probability, drawdown（分位点）, terminal_equity（分位点・平均など）
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[np.isfinite(returns)]
+    if len(returns) < 2:
+        raise ValueError('シミュレーションに必要なリターンが不足しています')
+    magnitudes = np.abs(returns)
+
+    rng = np.random.default_rng(seed)
+    chunk = int(max(1, min(n_paths, memory_mb * 2**20 // (horizon * BYTES_PER_STEP))))
+
+    terminal = np.empty(n_paths)
+    max_drawdown = np.empty(n_paths)
+    ruined = np.empty(n_paths, dtype=bool)
+    log_ruin = np.log(ruin_level)
+
+    for start in range(0, n_paths, chunk):
+        size = min(chunk, n_paths - start)
+        idx = rng.integers(0, len(returns), size=(size, horizon))
+        if win_rate is None:
+            step = returns[idx]
+        else:
+            sign = np.where(rng.random((size, horizon)) < win_rate, 1.0, -1.0)
+            step = magnitudes[idx] * sign
+        del idx
+
+        # 建玉比率を掛けた1取引の損益（資金全損を下限とする）
+        step *= exposure
+        np.maximum(step, -1.0 + 1e-12, out=step)
+        np.log1p(step, out=step)
+        log_equity = np.cumsum(step, axis=1, out=step)
+
+        running_max = np.maximum.accumulate(np.maximum(log_equity, 0.0), axis=1)
+        running_max -= log_equity
+        drawdown = running_max.max(axis=1)
+        del running_max
+
+        sl = slice(start, start + size)
+        terminal[sl] = np.exp(log_equity[:, -1])
+        max_drawdown[sl] = -np.expm1(-drawdown)
+        ruined[sl] = log_equity.min(axis=1) <= log_ruin
+        del log_equity, step
+
+    return {
+        'paths': int(n_paths),
+        'horizon': int(horizon),
+        'exposure': float(exposure),
+        'chunk_paths': chunk,
+        'ruin_level': float(ruin_level),
+        'ruin_probability': float(ruined.mean()),
+        'drawdown': {
+            'mean': float(max_drawdown.mean() * 100),
+            'quantiles': {str(q): float(v * 100) for q, v in
+                          zip(DRAWDOWN_QUANTILES, np.quantile(max_drawdown, DRAWDOWN_QUANTILES))},
+        },
+        'terminal_equity': {
+            'mean': float(terminal.mean()),
+            'median': float(np.median(terminal)),
+            'prob_loss': float((terminal < 1.0).mean()),
+            'quantiles': {str(q): float(v) for q, v in
+                          zip(TERMINAL_QUANTILES, np.quantile(terminal, TERMINAL_QUANTILES))},
+            'histogram': _histogram(terminal),
+        },
+    }
+
+
+def _histogram(values, bins=30):
+    """最終資産の分布（対数スケールのビン）"""
+    low, high = np.quantile(values, (0.005, 0.995))
+    low = max(low, 1e-6)
+    high = max(high, low * 1.01)
+    edges = np.geomspace(low, high, bins + 1)
+    counts, _ = np.histogram(np.clip(values, low, high), bins=edges)
+    return {'edges': edges.round(6).tolist(), 'counts': counts.tolist()}
+
+
+class RiskSimulator:
+    """サイズ設定・ボラティリティ局面ごとにシミュレーション結果をキャッシュ"""
+
+    def __init__(self, n_paths=20000, horizon=250, memory_mb=64, max_entries=8):
+        self.n_paths = n_paths
+        self.horizon = horizon
+        self.memory_mb = memory_mb
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def run(self, returns, kelly_fraction, max_leverage, win_rate=None, ruin_level=0.5):
+        """キャッシュ済みならその結果を返し、条件が変わった場合のみ再計算"""
+        regime, ratio = volatility_regime(returns)
+        key = (round(float(kelly_fraction), 4), round(float(max_leverage), 4), regime,
+               None if win_rate is None else round(float(win_rate), 2), float(ruin_level))
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return dict(cached, cached=True)
+
+        result = simulate(returns, kelly_fraction * max_leverage, n_paths=self.n_paths,
+                          horizon=self.horizon, win_rate=win_rate, ruin_level=ruin_level,
+                          memory_mb=self.memory_mb)
+        result.update({
+            'kelly_fraction': float(kelly_fraction),
+            'max_leverage': float(max_leverage),
+            'win_rate': win_rate,
+            'regime': regime,
+            'volatility_ratio': ratio,
+        })
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return dict(result, cached=False)
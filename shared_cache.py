@@ -0,0 +1,181 @@
+"""
+ワーカープロセス間共有キャッシュ
+
+最新のステータススナップショット（JSONバイト列）やOHLC配列を
+1項目 = 1ファイルとして保存し、各ワーカーは mmap で読み出す。
+期限切れの項目はロックを取れた1ワーカーだけが再計算し、
+他のワーカーは更新中も古い値を返す（上流への負荷はワーカー数に比例しない）。
+
+書き込みは一時ファイル + os.replace で行うため、読み出し側にロックは不要。
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MAGIC = b'FXSC'
+# magic, 種別, 更新時刻, メタ情報長, ペイロード長
+HEADER = struct.Struct('<4sIdIQ')
+KIND_BYTES = 0
+KIND_ARRAY = 1
+
+# Windows ではマップ中のファイルを置き換えられないため、読み出しはコピーで行う
+ZERO_COPY = os.name != 'nt'
+
+
+class FileLock:
+    """プロセス間ファイルロック（同一プロセス内のスレッド間でも排他）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=True):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        f = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                while True:
+                    try:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.05)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SharedCache:
+    """mmap ファイルによるワーカー間共有キャッシュ"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._mapped = {}  # name -> (ファイル識別子, 更新時刻, 値)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def write(self, name, value):
+        """bytes または numpy 配列を保存"""
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            meta = json.dumps({
+                'descr': np.lib.format.dtype_to_descr(value.dtype),
+                'shape': value.shape,
+            }).encode('utf-8')
+            kind, payload = KIND_ARRAY, value.tobytes()
+        else:
+            meta, kind, payload = b'', KIND_BYTES, bytes(value)
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, kind, time.time(), len(meta), len(payload)))
+            f.write(meta)
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def read(self, name):
+        """(更新時刻, 値) を返す。配列は mmap 上のビュー（読み取り専用）"""
+        path = self._path(name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        ident = (st.st_ino, st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            cached = self._mapped.get(name)
+            if cached is not None and cached[0] == ident:
+                return cached[1], cached[2]
+
+        with open(path, 'rb') as f:
+            if ZERO_COPY:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+
+        magic, kind, updated_at, meta_len, payload_len = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            return None
+        offset = HEADER.size + meta_len
+        if kind == KIND_ARRAY:
+            meta = json.loads(bytes(buffer[HEADER.size:offset]))
+            dtype = np.lib.format.descr_to_dtype(meta['descr'])
+            count = int(np.prod(meta['shape'])) if meta['shape'] else 1
+            value = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(meta['shape'])
+        else:
+            value = bytes(buffer[offset:offset + payload_len])
+
+        with self._lock:
+            self._mapped[name] = (ident, updated_at, value)
+        return updated_at, value
+
+    def nbytes(self):
+        """このプロセスがマップ中の値のバイト数（ファイル上のページは他ワーカーと共有）"""
+        with self._lock:
+            return sum(len(value) if isinstance(value, bytes) else value.nbytes
+                       for _, _, value in self._mapped.values())
+
+    def get_or_refresh(self, name, ttl, producer):
+        """期限内ならキャッシュを返し、期限切れならロックを取れたワーカーだけが再計算
+
+        ロックを取れなかったワーカーは古い値を返す（値が無い場合のみ更新完了を待つ）。
+        """
+        item = self.read(name)
+        if item is not None and time.time() - item[0] < ttl:
+            return item[1]
+
+        lock = FileLock(self._path(name) + '.lock')
+        if not lock.acquire(blocking=item is None):
+            return item[1]
+        try:
+            # 待機中に他のワーカーが更新済みかもしれない
+            item = self.read(name)
+            if item is not None and time.time() - item[0] < ttl:
+                return item[1]
+            self.write(name, producer())
+            return self.read(name)[1]
+        finally:
+            lock.release()
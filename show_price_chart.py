@@ -2,18 +2,229 @@
 USD/JPY価格推移グラフ表示
 
 過去のデータと現在の価格をグラフ化
+
+バッチモード（非対話・ヘッドレス）:
+    python show_price_chart.py --pairs USD/JPY,EUR/USD --days 30,180 --sizes full,thumb
+通貨ペア × 期間 × 足種の組み合わせをプロセスプールで並列に描画し、
+チャートごとの描画時間を表示する。価格データは期間をまとめて1回だけ取得して再利用する。
 """
 
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from datetime import datetime, timedelta
 import yfinance as yf
 import numpy as np
 
-# 日本語フォント設定
-plt.rcParams['font.sans-serif'] = ['MS Gothic', 'Yu Gothic', 'Meiryo']
-plt.rcParams['axes.unicode_minus'] = False
+from compact_frame import (CompactFrame, compact_enabled, epoch_seconds, pct_change,
+                           rolling_mean, rolling_std)
+
+# 日本語フォント候補（Windows / macOS / Linux の順。見つかったものだけを使う）
+JAPANESE_FONTS = ['MS Gothic', 'Yu Gothic', 'Meiryo', 'Hiragino Sans', 'IPAexGothic',
+                  'IPAGothic', 'Noto Sans CJK JP', 'Noto Sans JP', 'TakaoGothic']
+
+def configure_fonts():
+    """インストール済みの日本語フォントを優先し、無ければ既定フォントにフォールバック"""
+    from matplotlib import font_manager
+
+    installed = {f.name for f in font_manager.fontManager.ttflist}
+    fonts = [name for name in JAPANESE_FONTS if name in installed]
+    plt.rcParams['font.sans-serif'] = fonts + list(plt.rcParams['font.sans-serif'])
+    plt.rcParams['axes.unicode_minus'] = False
+
+configure_fonts()
+
+PRICE_COLUMNS = ['Close', 'USD_JPY', 'MA_7', 'MA_25', 'MA_50', 'BB_upper', 'BB_lower']
+
+# 足種 -> (移動平均の単位, 変動率の表示名)。それ以外の足種は「本」「<足種>足」
+INTERVAL_LABELS = {'1d': ('日', '日次'), '5d': ('本', '5日'), '1wk': ('週', '週次'), '1mo': ('ヶ月', '月次')}
+# 年率換算に使う年間の取引日数（1日未満の足は 24時間取引として換算）
+TRADING_DAYS = 252
+
+def pair_symbol(pair):
+    """'USD/JPY' -> Yahoo Finance のシンボル 'USDJPY=X'"""
+    return pair.replace('/', '').upper() + '=X'
+
+def interval_labels(interval):
+    """足種から (移動平均の単位, 変動率の表示名) を返す（例: '1d' -> ('日', '日次')）"""
+    return INTERVAL_LABELS.get(interval, ('本', f'{interval}足'))
+
+def quote_unit(pair):
+    """価格の単位（'USD/JPY' -> '円'、'EUR/USD' -> 'USD'）"""
+    quote = pair.split('/')[-1].upper()
+    return '円' if quote == 'JPY' else quote
+
+def bar_seconds(index):
+    """インデックスのバー間隔（秒、中央値。判定できない場合は1日）"""
+    if len(index) < 2:
+        return 86400.0
+    spacing = float(np.median(np.diff(epoch_seconds(index))))
+    return spacing if spacing > 0 else 86400.0
+
+def bars_per_year(index):
+    """バー間隔から年率換算の係数（1年あたりのバー数）を求める（日足 = 252）"""
+    return TRADING_DAYS * 86400.0 / bar_seconds(index)
+
+def fetch_history(symbol, start, end, interval='1d'):
+    """終値の履歴を取得"""
+    data = yf.Ticker(symbol).history(start=start, end=end, interval=interval)
+    return data[['Close']] if not data.empty else data
+
+def fetch_price_data(symbol="USDJPY=X", days=180, compact=None):
+    """価格データを取得し、移動平均・ボリンジャーバンドを付与
+
+    Args:
+        compact: True なら float32 の連続ブロック上で計算（None の場合は DASHBOARD_COMPACT に従う）
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    return add_indicators(fetch_history(symbol, start_date, end_date), compact=compact)
+
+def add_indicators(data, compact=None):
+    """終値の履歴に移動平均・ボリンジャーバンドを付与"""
+    if data.empty:
+        return data
+
+    if compact_enabled() if compact is None else compact:
+        return _compact_price_data(data)
+
+    # USD/JPYの価格（そのまま使用）
+    data = data[['Close']].copy()
+    data['USD_JPY'] = data['Close']
+
+    # 移動平均計算
+    data['MA_7'] = data['USD_JPY'].rolling(window=7).mean()
+    data['MA_25'] = data['USD_JPY'].rolling(window=25).mean()
+    data['MA_50'] = data['USD_JPY'].rolling(window=50).mean()
+
+    # ボリンジャーバンド
+    data['BB_upper'] = data['MA_25'] + (data['USD_JPY'].rolling(window=25).std() * 2)
+    data['BB_lower'] = data['MA_25'] - (data['USD_JPY'].rolling(window=25).std() * 2)
+
+    return data
+
+def _compact_price_data(history):
+    """移動平均・ボリンジャーバンドを各列へ直接書き込む（途中の Series を作らない）"""
+    frame = CompactFrame(epoch_seconds(history.index), PRICE_COLUMNS)
+    frame.tz = history.index.tz
+    frame['Close'] = history['Close'].to_numpy()
+
+    price = frame['Close']
+    frame['USD_JPY'] = price
+    rolling_mean(price, 7, out=frame['MA_7'])
+    rolling_mean(price, 25, out=frame['MA_25'])
+    rolling_mean(price, 50, out=frame['MA_50'])
+
+    band = frame['BB_upper']
+    rolling_std(price, 25, out=band)
+    band *= 2
+    np.subtract(frame['MA_25'], band, out=frame['BB_lower'])
+    band += frame['MA_25']
+    return frame.to_dataframe()
+
+def plot_price_chart(data, fig=None, title='USD/JPY 価格推移分析', pair='USD/JPY', interval='1d'):
+    """価格チャートを描画
+
+    Args:
+        data: fetch_price_data() の戻り値
+        fig: 描画先Figure（省略時は pyplot で新規作成）
+        title: グラフタイトル
+        pair: 通貨ペア（凡例・価格の単位に使用）
+        interval: 足種（移動平均・変動率のラベルに使用。年率換算はバー間隔から求める）
+
+    Returns:
+        描画済みFigure
+    """
+    if fig is None:
+        fig = plt.figure(figsize=(16, 12))
+    axes = fig.subplots(3, 1)
+    fig.suptitle(title, fontsize=20, fontweight='bold', y=0.995)
+
+    unit, period = interval_labels(interval)
+    price_unit = quote_unit(pair)
+    spacing = bar_seconds(data.index)
+    intraday = spacing < 86400
+
+    def format_dates(ax):
+        if intraday:
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        else:
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+            ax.xaxis.set_major_locator(mdates.MonthLocator())
+        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+
+    # === グラフ1: 価格推移 + 移動平均 ===
+    ax1 = axes[0]
+    ax1.plot(data.index, data['USD_JPY'], label=pair, color='#2E86AB', linewidth=2)
+    ax1.plot(data.index, data['MA_7'], label=f'7{unit}移動平均', color='#F77F00', linewidth=1.5, alpha=0.7)
+    ax1.plot(data.index, data['MA_25'], label=f'25{unit}移動平均', color='#06A77D', linewidth=1.5, alpha=0.7)
+    ax1.plot(data.index, data['MA_50'], label=f'50{unit}移動平均', color='#D62828', linewidth=1.5, alpha=0.7)
+
+    # ボリンジャーバンド
+    ax1.fill_between(data.index, data['BB_upper'], data['BB_lower'], alpha=0.1, color='gray', label='ボリンジャーバンド(±2σ)')
+
+    ax1.set_ylabel(f'価格 ({price_unit})', fontsize=12, fontweight='bold')
+    ax1.set_title('価格推移と移動平均線', fontsize=14, fontweight='bold', pad=10)
+    ax1.legend(loc='best', fontsize=10)
+    ax1.grid(True, alpha=0.3)
+    format_dates(ax1)
+
+    # 最新価格をマーク
+    latest_price = data['USD_JPY'].iloc[-1]
+    latest_date = data.index[-1]
+    ax1.scatter([latest_date], [latest_price], color='red', s=100, zorder=5, marker='o')
+    latest_text = f'{latest_price:.2f}円' if price_unit == '円' else f'{latest_price:.5f} {price_unit}'
+    ax1.annotate(f'現在: {latest_text}',
+                 xy=(latest_date, latest_price),
+                 xytext=(10, 10), textcoords='offset points',
+                 bbox=dict(boxstyle='round,pad=0.5', fc='yellow', alpha=0.7),
+                 fontsize=10, fontweight='bold')
+
+    # === グラフ2: バーごとの変動率 ===
+    ax2 = axes[1]
+    price = data['USD_JPY'].to_numpy()
+    bar_returns = pct_change(price)
+    bar_returns *= 100
+    colors = ['green' if x > 0 else 'red' for x in bar_returns]
+    ax2.bar(data.index, bar_returns, color=colors, alpha=0.6, width=spacing / 86400)
+    ax2.axhline(y=0, color='black', linestyle='-', linewidth=0.8)
+    ax2.set_ylabel('変動率 (%)', fontsize=12, fontweight='bold')
+    ax2.set_title(f'{period}変動率', fontsize=14, fontweight='bold', pad=10)
+    ax2.grid(True, alpha=0.3, axis='y')
+    format_dates(ax2)
+
+    # === グラフ3: 出来高（実際にはボラティリティ） ===
+    ax3 = axes[2]
+
+    # ボラティリティ（20本の標準偏差をバー間隔から年率換算）
+    volatility = annualized_volatility(price, periods_per_year=bars_per_year(data.index))
+    ax3.plot(data.index, volatility, label='ボラティリティ(年率)', color='#8B4513', linewidth=2)
+    ax3.fill_between(data.index, volatility, alpha=0.3, color='#8B4513')
+    ax3.set_ylabel('ボラティリティ (%)', fontsize=12, fontweight='bold')
+    ax3.set_xlabel('日付', fontsize=12, fontweight='bold')
+    ax3.set_title('ボラティリティ推移', fontsize=14, fontweight='bold', pad=10)
+    ax3.legend(loc='best', fontsize=10)
+    ax3.grid(True, alpha=0.3)
+    format_dates(ax3)
+
+    # レイアウト調整
+    fig.tight_layout()
+    return fig
+
+def annualized_volatility(price, window=20, periods_per_year=TRADING_DAYS):
+    """window 本の変動率の標準偏差（年率, %。periods_per_year は1年あたりのバー数、日足 = 252）"""
+    volatility = rolling_std(pct_change(price), window)
+    volatility *= 100 * np.sqrt(periods_per_year)
+    return volatility
 
 def create_price_chart():
     """USD/JPY価格推移グラフを作成"""
@@ -25,99 +236,25 @@ def create_price_chart():
     try:
         # データ取得（過去6ヶ月）
         print("\nデータ取得中...")
-        ticker = yf.Ticker("USDJPY=X")
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=180)  # 6ヶ月
-
-        data = ticker.history(start=start_date, end=end_date, interval='1d')
+        data = fetch_price_data(days=180)
 
         if data.empty:
             print("エラー: データが取得できませんでした")
             return
 
-        # USD/JPYの価格（そのまま使用）
-        data['USD_JPY'] = data['Close']
-
         print(f"データ取得完了: {len(data)}日分")
         print(f"期間: {data.index[0].strftime('%Y-%m-%d')} ~ {data.index[-1].strftime('%Y-%m-%d')}")
         print(f"現在価格: {data['USD_JPY'].iloc[-1]:.2f}円")
 
-        # 移動平均計算
-        data['MA_7'] = data['USD_JPY'].rolling(window=7).mean()
-        data['MA_25'] = data['USD_JPY'].rolling(window=25).mean()
-        data['MA_50'] = data['USD_JPY'].rolling(window=50).mean()
-
-        # ボリンジャーバンド
-        data['BB_upper'] = data['MA_25'] + (data['USD_JPY'].rolling(window=25).std() * 2)
-        data['BB_lower'] = data['MA_25'] - (data['USD_JPY'].rolling(window=25).std() * 2)
-
         # グラフ作成
-        fig, axes = plt.subplots(3, 1, figsize=(16, 12))
-        fig.suptitle('USD/JPY 価格推移分析', fontsize=20, fontweight='bold', y=0.995)
-
-        # === グラフ1: 価格推移 + 移動平均 ===
-        ax1 = axes[0]
-        ax1.plot(data.index, data['USD_JPY'], label='USD/JPY', color='#2E86AB', linewidth=2)
-        ax1.plot(data.index, data['MA_7'], label='7日移動平均', color='#F77F00', linewidth=1.5, alpha=0.7)
-        ax1.plot(data.index, data['MA_25'], label='25日移動平均', color='#06A77D', linewidth=1.5, alpha=0.7)
-        ax1.plot(data.index, data['MA_50'], label='50日移動平均', color='#D62828', linewidth=1.5, alpha=0.7)
-
-        # ボリンジャーバンド
-        ax1.fill_between(data.index, data['BB_upper'], data['BB_lower'], alpha=0.1, color='gray', label='ボリンジャーバンド(±2σ)')
-
-        ax1.set_ylabel('価格 (円)', fontsize=12, fontweight='bold')
-        ax1.set_title('価格推移と移動平均線', fontsize=14, fontweight='bold', pad=10)
-        ax1.legend(loc='best', fontsize=10)
-        ax1.grid(True, alpha=0.3)
-        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        ax1.xaxis.set_major_locator(mdates.MonthLocator())
-        plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45, ha='right')
-
-        # 最新価格をマーク
+        fig = plot_price_chart(data)
         latest_price = data['USD_JPY'].iloc[-1]
-        latest_date = data.index[-1]
-        ax1.scatter([latest_date], [latest_price], color='red', s=100, zorder=5, marker='o')
-        ax1.annotate(f'現在: {latest_price:.2f}円',
-                     xy=(latest_date, latest_price),
-                     xytext=(10, 10), textcoords='offset points',
-                     bbox=dict(boxstyle='round,pad=0.5', fc='yellow', alpha=0.7),
-                     fontsize=10, fontweight='bold')
-
-        # === グラフ2: 日次変動率 ===
-        ax2 = axes[1]
-        daily_returns = data['USD_JPY'].pct_change() * 100
-        colors = ['green' if x > 0 else 'red' for x in daily_returns]
-        ax2.bar(data.index, daily_returns, color=colors, alpha=0.6, width=1.0)
-        ax2.axhline(y=0, color='black', linestyle='-', linewidth=0.8)
-        ax2.set_ylabel('変動率 (%)', fontsize=12, fontweight='bold')
-        ax2.set_title('日次変動率', fontsize=14, fontweight='bold', pad=10)
-        ax2.grid(True, alpha=0.3, axis='y')
-        ax2.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        ax2.xaxis.set_major_locator(mdates.MonthLocator())
-        plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45, ha='right')
-
-        # === グラフ3: 出来高（実際にはボラティリティ） ===
-        ax3 = axes[2]
-
-        # ボラティリティ（20日間の標準偏差）
-        volatility = data['USD_JPY'].pct_change().rolling(window=20).std() * 100 * np.sqrt(252)
-        ax3.plot(data.index, volatility, label='ボラティリティ(年率)', color='#8B4513', linewidth=2)
-        ax3.fill_between(data.index, volatility, alpha=0.3, color='#8B4513')
-        ax3.set_ylabel('ボラティリティ (%)', fontsize=12, fontweight='bold')
-        ax3.set_xlabel('日付', fontsize=12, fontweight='bold')
-        ax3.set_title('ボラティリティ推移', fontsize=14, fontweight='bold', pad=10)
-        ax3.legend(loc='best', fontsize=10)
-        ax3.grid(True, alpha=0.3)
-        ax3.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        ax3.xaxis.set_major_locator(mdates.MonthLocator())
-        plt.setp(ax3.xaxis.get_majorticklabels(), rotation=45, ha='right')
-
-        # レイアウト調整
-        plt.tight_layout()
+        volatility = annualized_volatility(data['USD_JPY'].to_numpy(),
+                                           periods_per_year=bars_per_year(data.index))
 
         # 保存
         output_file = 'outputs/usd_jpy_price_chart.png'
-        plt.savefig(output_file, dpi=150, bbox_inches='tight')
+        fig.savefig(output_file, dpi=150, bbox_inches='tight')
         print(f"\nグラフ保存: {output_file}")
 
         # 統計情報表示
@@ -145,7 +282,7 @@ def create_price_chart():
         print(f"  平均値: {data['USD_JPY'].mean():.2f}円")
         print(f"  標準偏差: {data['USD_JPY'].std():.2f}円")
 
-        current_volatility = volatility.iloc[-1]
+        current_volatility = volatility[-1]
         print(f"\n現在のボラティリティ: {current_volatility:.2f}% (年率)")
 
         # トレンド分析
@@ -185,5 +322,195 @@ def create_price_chart():
         import traceback
         traceback.print_exc()
 
+# ===== バッチモード =====
+
+DATA_CACHE_DIR = os.path.join('outputs', 'price_cache')
+# 終了日が今日以降の期間は、この秒数を過ぎたら取り直す
+DATA_CACHE_TTL = 3600
+
+_history_memo = {}  # ワーカー内: キャッシュファイル -> DataFrame
+
+def parse_ranges(days=None, ranges=None, today=None):
+    """'30,180'（直近N日）と 'YYYY-MM-DD:YYYY-MM-DD' の並びを (ラベル, 開始日, 終了日) に変換"""
+    today = today or datetime.now().date()
+    result = []
+    for value in (days or '').split(','):
+        if value.strip():
+            n = int(value)
+            result.append((f'{n}d', today - timedelta(days=n), today + timedelta(days=1)))
+    for value in ranges or []:
+        start, end = (datetime.strptime(v.strip(), '%Y-%m-%d').date() for v in value.split(':'))
+        if end <= start:
+            raise ValueError(f'期間の終了日が開始日以前です: {value}')
+        result.append((f'{start:%Y%m%d}-{end:%Y%m%d}', start, end))
+    return result
+
+def load_history(symbol, start, end, interval='1d', cache_dir=DATA_CACHE_DIR, refresh=False):
+    """期間の価格履歴をディスクキャッシュ経由で取得
+
+    Returns:
+        tuple: (キャッシュファイルのパス, キャッシュを使ったか)
+    """
+    path = os.path.join(cache_dir, f'{symbol}_{interval}_{start:%Y%m%d}_{end:%Y%m%d}.pkl')
+    if not refresh and os.path.exists(path):
+        closed = end <= datetime.now().date()
+        if closed or time.time() - os.path.getmtime(path) < DATA_CACHE_TTL:
+            return path, True
+
+    data = fetch_history(symbol, start, end, interval)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    data.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    return path, False
+
+def _init_worker():
+    """ワーカー起動時に1回だけ matplotlib を初期化（Agg バックエンド・フォント・描画系の読み込み）"""
+    import io
+    matplotlib.use('Agg')
+    configure_fonts()
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(1, 1))
+    fig.text(0.5, 0.5, '初期化')
+    fig.savefig(io.BytesIO(), format='png')
+
+def _prefetch(job):
+    symbol, start, end, interval, refresh = job
+    started = time.perf_counter()
+    path, cached = load_history(symbol, start, end, interval, refresh=refresh)
+    return path, cached, time.perf_counter() - started
+
+def _render_job(job):
+    """1枚のチャートを描画（同じデータ・パラメータの画像があれば描画しない）"""
+    from matplotlib.figure import Figure
+    from chart_cache import CHART_SIZES, chart_key
+
+    started = time.perf_counter()
+    history = _history_memo.get(job['source'])
+    if history is None:
+        history = _history_memo[job['source']] = pd.read_pickle(job['source'])
+
+    index = history.index.tz_localize(None) if history.index.tz is not None else history.index
+    mask = (index >= pd.Timestamp(job['start'])) & (index < pd.Timestamp(job['end']))
+    data = add_indicators(history[mask], compact=job['compact'])
+    result = {key: job[key] for key in ('pair', 'interval', 'label')}
+    result.update({'rows': int(len(data)), 'files': [], 'cached': False})
+    if data.empty:
+        result['error'] = 'データがありません'
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    params = {'chart': 'price', 'pair': job['pair'], 'interval': job['interval'],
+              'figsize': (16, 12), 'sizes': job['sizes']}
+    key = chart_key(data, params)
+    base = os.path.join(job['out'], f"{job['pair'].replace('/', '')}_{job['interval']}_{job['label']}")
+    result['files'] = [f'{base}_{size}.png' for size in job['sizes']]
+
+    key_path = base + '.key'
+    if os.path.exists(key_path) and all(os.path.exists(f) for f in result['files']):
+        with open(key_path) as f:
+            result['cached'] = f.read().strip() == key
+
+    if not result['cached']:
+        title = f"{job['pair']} 価格推移分析（{job['interval']}）"
+        fig = plot_price_chart(data, fig=Figure(figsize=params['figsize']), title=title,
+                               pair=job['pair'], interval=job['interval'])
+        try:
+            for size, path in zip(job['sizes'], result['files']):
+                fig.savefig(path, format='png', dpi=CHART_SIZES[size], bbox_inches='tight')
+        finally:
+            fig.clear()
+        with open(key_path, 'w') as f:
+            f.write(key)
+
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+def run_batch(pairs, ranges, intervals=('1d',), sizes=('full',), out='outputs/reports',
+              workers=None, refresh=False, compact=None):
+    """通貨ペア × 期間 × 足種のチャートをプロセスプールで並列に描画
+
+    Returns:
+        list: チャートごとの結果（pair, interval, label, files, seconds, cached）
+    """
+    from chart_cache import CHART_SIZES
+
+    unknown = [size for size in sizes if size not in CHART_SIZES]
+    if unknown:
+        raise ValueError(f'未対応のサイズ: {", ".join(unknown)}（{", ".join(CHART_SIZES)}）')
+    os.makedirs(out, exist_ok=True)
+    compact = compact_enabled() if compact is None else compact
+
+    # 価格データはペア・足種ごとに全期間をまとめて1回だけ取得
+    first = min(start for _, start, _ in ranges)
+    last = max(end for _, _, end in ranges)
+    groups = {(pair, interval): (pair_symbol(pair), first, last, interval, refresh)
+              for pair in pairs for interval in intervals}
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        sources = dict(zip(groups, pool.map(_prefetch, groups.values())))
+        for (pair, interval), (path, cached, seconds) in sources.items():
+            print(f"データ: {pair} {interval} {seconds:.2f}秒{'（キャッシュ）' if cached else ''}")
+
+        jobs = [
+            {'pair': pair, 'interval': interval, 'label': label, 'start': start, 'end': end,
+             'source': sources[(pair, interval)][0], 'sizes': list(sizes), 'out': out,
+             'compact': compact}
+            for (pair, interval) in groups for label, start, end in ranges
+        ]
+        futures = [pool.submit(_render_job, job) for job in jobs]
+        for n, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            status = result.get('error') or ('キャッシュ' if result['cached'] else '描画')
+            print(f"[{n:>3}/{len(jobs)}] {result['pair']} {result['interval']} {result['label']}: "
+                  f"{result['seconds']:.2f}秒（{status}）")
+            results.append(result)
+    return sorted(results, key=lambda r: (r['pair'], r['interval'], r['label']))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='価格チャート生成（引数なしで USD/JPY 180日を表示）')
+    parser.add_argument('--pairs', help='通貨ペア（カンマ区切り、例: USD/JPY,EUR/USD）')
+    parser.add_argument('--days', help='直近N日の期間（カンマ区切り、例: 30,90,180）')
+    parser.add_argument('--range', action='append', help='期間 YYYY-MM-DD:YYYY-MM-DD（複数指定可）')
+    parser.add_argument('--intervals', default='1d', help='足種（カンマ区切り、例: 1h,1d）')
+    parser.add_argument('--sizes', default='full', help='画像サイズ（full,medium,thumb）')
+    parser.add_argument('--out', default=os.path.join('outputs', 'reports'), help='出力ディレクトリ')
+    parser.add_argument('--workers', type=int, default=None, help='プロセス数（既定: CPUコア数）')
+    parser.add_argument('--refresh', action='store_true', help='価格データのキャッシュを使わない')
+    parser.add_argument('--compact', action='store_true', help='float32 で計算（DASHBOARD_COMPACT と同じ）')
+    args = parser.parse_args(argv)
+
+    if not (args.pairs or args.days or args.range):
+        create_price_chart()
+        return 0
+
+    matplotlib.use('Agg')
+    pairs = [p.strip().upper() for p in (args.pairs or 'USD/JPY').split(',') if p.strip()]
+    ranges = parse_ranges(args.days or ('' if args.range else '180'), args.range)
+    started = time.perf_counter()
+    results = run_batch(
+        pairs, ranges,
+        intervals=[v.strip() for v in args.intervals.split(',') if v.strip()],
+        sizes=[v.strip() for v in args.sizes.split(',') if v.strip()],
+        out=args.out, workers=args.workers, refresh=args.refresh,
+        compact=True if args.compact else None,
+    )
+    elapsed = time.perf_counter() - started
+
+    rendered = [r for r in results if not r['cached'] and 'error' not in r]
+    render_time = sum(r['seconds'] for r in results)
+    print("\n" + "=" * 80)
+    print(f"チャート {len(results)}枚（描画 {len(rendered)} / キャッシュ "
+          f"{sum(r['cached'] for r in results)} / エラー {sum('error' in r for r in results)}）")
+    print(f"合計 {elapsed:.2f}秒（描画時間の合計 {render_time:.2f}秒）")
+    print("=" * 80)
+
+    report = {'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+              'elapsed': elapsed, 'charts': results}
+    with open(os.path.join(args.out, 'report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    return 1 if any('error' in r for r in results) else 0
+
 if __name__ == '__main__':
-    create_price_chart()
+    sys.exit(main())
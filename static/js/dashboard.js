@@ -0,0 +1,366 @@
+// ポーリング設定
+const POLL_INTERVAL = 30000;       // 通常: 30秒
+const MAX_POLL_INTERVAL = 300000;  // エラー時のバックオフ上限: 5分
+const CHART_INTERVAL = 300000;     // チャート: 5分
+
+let pollDelay = POLL_INTERVAL;
+let pollTimer = null;
+let lastChartRefresh = 0;
+
+// セクションごとに最後に描画したデータ（変化がなければ描画しない）
+const rendered = {};
+
+function changed(section, data) {
+    const version = JSON.stringify(data);
+    if (rendered[section] === version) return false;
+    rendered[section] = version;
+    return true;
+}
+
+// セクションの骨組みを必要なときだけ作成
+function skeleton(elementId, kind, html) {
+    const root = document.getElementById(elementId);
+    if (root.dataset.kind !== kind) {
+        root.innerHTML = html;
+        root.dataset.kind = kind;
+        root.classList.remove('loading');
+    }
+    return root;
+}
+
+// 値が変わったノードだけ更新
+function setField(root, name, text, className) {
+    const el = root.querySelector(`[data-field="${name}"]`);
+    if (el.textContent !== text) el.textContent = text;
+    if (className !== undefined && el.className !== className) el.className = className;
+}
+
+function showMessage(elementId, message) {
+    const root = skeleton(elementId, 'message', '<p class="loading" data-field="message"></p>');
+    setField(root, 'message', message);
+}
+
+function showError(elementId, message) {
+    showMessage(elementId, `エラー: ${message}`);
+}
+
+// options.badge: 値をバッジで表示 / options.note: 値の後ろに補足 / options.style: 値のスタイル
+function metricRow(label, field, options = {}) {
+    const style = options.style ? ` style="${options.style}"` : '';
+    const value = options.badge || options.note ?
+        `<span class="metric-value"${style}><span data-field="${field}"></span>${options.note ? ` <small>${options.note}</small>` : ''}</span>` :
+        `<span class="metric-value" data-field="${field}"${style}></span>`;
+    return `<div class="metric"><span class="metric-label">${label}</span>${value}</div>`;
+}
+
+// データ更新関数
+async function updateDashboard() {
+    if (document.hidden) return;
+
+    try {
+        // サーバーは ETag を返すため、変化がなければ 304 で本文は送られない
+        const response = await fetch('/api/status', { cache: 'no-cache' });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+
+        // タスク状態更新
+        updateTaskInfo('fixed-task-info', data.tasks.fixed_model);
+        updateTaskInfo('adaptive-task-info', data.tasks.adaptive_model);
+
+        // 予測更新
+        updatePrediction(data.prediction);
+
+        // 市場統計更新
+        updateMarketStats(data.market_stats);
+
+        // 適応パラメータ更新
+        updateAdaptiveParams(data.adaptive_params);
+
+        // システム比較更新
+        updateComparison(data.system_comparison);
+
+        // 通貨ペア相関更新
+        updateCorrelation(data.correlation);
+
+        // 取引履歴更新
+        updateTradeHistory(data.trade_history);
+
+        // 更新時刻表示
+        const now = new Date().toLocaleString('ja-JP');
+        document.getElementById('update-indicator').textContent = `最終更新: ${now}`;
+        pollDelay = POLL_INTERVAL;
+
+    } catch (error) {
+        console.error('データ取得エラー:', error);
+        // 失敗が続く間は間隔を倍々に延ばす
+        pollDelay = Math.min(pollDelay * 2, MAX_POLL_INTERVAL);
+    }
+}
+
+function updateTaskInfo(elementId, taskData) {
+    if (!changed(elementId, taskData)) return;
+
+    const root = skeleton(elementId, 'task',
+        metricRow('タスクID', 'task_id', { badge: true }) +
+        metricRow('状態', 'status', { badge: true }) +
+        metricRow('開始時刻', 'started') +
+        metricRow('タイプ', 'type') +
+        metricRow('詳細', 'description', { style: 'font-size: 0.9em;' }));
+
+    setField(root, 'task_id', taskData.task_id, 'badge info');
+    setField(root, 'status', taskData.status === 'running' ? '実行中' : taskData.status, 'badge success');
+    setField(root, 'started', taskData.started);
+    setField(root, 'type', taskData.type);
+    setField(root, 'description', taskData.description);
+}
+
+function updatePrediction(pred) {
+    if (!changed('prediction', pred)) return;
+    if (pred.error) {
+        showError('prediction-info', pred.error);
+        return;
+    }
+
+    const root = skeleton('prediction-info', 'prediction', `
+        <div class="big-number" data-field="direction"></div>
+        ${metricRow('現在価格 (USD/JPY)', 'current_price')}
+        ${metricRow('信頼度', 'confidence')}
+        <div class="progress-bar">
+            <div class="progress-fill" data-field="confidence_bar"></div>
+        </div>
+        ${metricRow('期待リターン', 'expected_return')}
+        ${metricRow('取引判定', 'will_trade', { badge: true })}
+        ${metricRow('更新時刻', 'timestamp')}
+    `);
+
+    const directionClass = pred.direction === '上昇' ? 'up' : 'down';
+    const confidencePercent = (pred.confidence * 100).toFixed(2);
+    const thresholdPercent = (pred.confidence_threshold * 100).toFixed(0);
+    const confidenceOk = pred.confidence >= pred.confidence_threshold;
+    const returnOk = Math.abs(pred.expected_return) >= pred.return_threshold;
+
+    setField(root, 'direction', `${pred.direction === '上昇' ? '⬆' : '⬇'} ${pred.direction}`,
+        `big-number ${directionClass}`);
+    setField(root, 'current_price', `${pred.current_price.toFixed(2)}円`);
+    setField(root, 'confidence',
+        `${confidencePercent}% ${confidenceOk ? '✓ OK' : '✗ NG (閾値: ' + thresholdPercent + '%)'}`,
+        `metric-value ${confidenceOk ? 'positive' : 'negative'}`);
+    root.querySelector('[data-field="confidence_bar"]').style.width = `${confidencePercent}%`;
+    setField(root, 'expected_return',
+        `${pred.expected_return.toFixed(4)}% ${returnOk ? '✓ OK' : '✗ NG (閾値: ' + pred.return_threshold + '%)'}`,
+        `metric-value ${returnOk ? 'positive' : 'negative'}`);
+    setField(root, 'will_trade', pred.will_trade ? '取引実行' : '取引見送り',
+        pred.will_trade ? 'badge success' : 'badge warning');
+    setField(root, 'timestamp', pred.timestamp);
+}
+
+function updateMarketStats(stats) {
+    if (!changed('market', stats)) return;
+    if (stats.error) {
+        showError('market-stats', stats.error);
+        return;
+    }
+
+    const root = skeleton('market-stats', 'market',
+        metricRow('24時間変動', 'change') +
+        metricRow('ボラティリティ', 'volatility') +
+        metricRow('最高値', 'high') +
+        metricRow('最安値', 'low') +
+        metricRow('現在値', 'current'));
+
+    const up = stats.change >= 0;
+    setField(root, 'change', `${up ? '⬆' : '⬇'} ${stats.change.toFixed(2)}%`,
+        `metric-value ${up ? 'positive' : 'negative'}`);
+    setField(root, 'volatility', `${stats.volatility.toFixed(2)}%`);
+    setField(root, 'high', `${stats.high.toFixed(2)}円`);
+    setField(root, 'low', `${stats.low.toFixed(2)}円`);
+    setField(root, 'current', `${stats.current.toFixed(2)}円`);
+}
+
+function updateAdaptiveParams(params) {
+    if (!changed('adaptive', params)) return;
+    if (params.error) {
+        showError('adaptive-params', params.error);
+        return;
+    }
+
+    const root = skeleton('adaptive-params', 'adaptive',
+        metricRow('Kelly分数', 'kelly_fraction', { note: '(範囲: 0.30-0.65)' }) +
+        metricRow('最大レバレッジ', 'max_leverage', { note: '(範囲: 3.0x-9.0x)' }) +
+        metricRow('信頼度閾値', 'confidence_threshold', { note: '(範囲: 60-70%)' }) +
+        metricRow('市場ボラティリティ', 'volatility') +
+        metricRow('オンライン学習', 'online_model', { badge: true }));
+
+    setField(root, 'kelly_fraction', params.kelly_fraction.toFixed(2));
+    setField(root, 'max_leverage', `${params.max_leverage.toFixed(1)}x`);
+    setField(root, 'confidence_threshold', `${(params.confidence_threshold * 100).toFixed(0)}%`);
+    setField(root, 'volatility', `${(params.volatility * 100).toFixed(2)}%`);
+    setField(root, 'online_model',
+        params.online_model_trained ? '訓練済み' : `未訓練 (${params.update_buffer_size}/50)`,
+        params.online_model_trained ? 'badge success' : 'badge warning');
+}
+
+function updateComparison(comparison) {
+    if (!changed('comparison', comparison.features)) return;
+
+    const root = skeleton('comparison-table', 'comparison',
+        '<table class="comparison-table"><thead><tr><th>機能</th><th>固定モデル</th><th>適応学習モデル</th></tr></thead><tbody></tbody></table>');
+    const tbody = root.querySelector('tbody');
+
+    // 機能名をキーに行を再利用し、変化したセルだけ書き換える
+    const rows = new Map();
+    tbody.querySelectorAll('tr').forEach(tr => rows.set(tr.dataset.name, tr));
+
+    comparison.features.forEach((feature, index) => {
+        let tr = rows.get(feature.name);
+        if (!tr) {
+            tr = document.createElement('tr');
+            tr.dataset.name = feature.name;
+            tr.innerHTML = '<td><strong></strong></td><td></td><td></td>';
+            tr.querySelector('strong').textContent = feature.name;
+        }
+        rows.delete(feature.name);
+        const cells = tr.children;
+        if (cells[1].textContent !== feature.fixed) cells[1].textContent = feature.fixed;
+        if (cells[2].textContent !== feature.adaptive) cells[2].textContent = feature.adaptive;
+        if (tbody.children[index] !== tr) tbody.insertBefore(tr, tbody.children[index] || null);
+    });
+    rows.forEach(tr => tr.remove());
+}
+
+const REGIME_BADGES = {
+    low: ['低ボラ', 'badge info'],
+    normal: ['通常', 'badge success'],
+    high: ['高ボラ', 'badge danger'],
+};
+
+// 相関係数 -1..1 を青（負）〜白〜赤（正）の背景色に変換
+function correlationColor(value) {
+    if (value === null) return '';
+    const alpha = Math.min(Math.abs(value), 1) * 0.6;
+    return value >= 0 ? `rgba(220, 38, 38, ${alpha})` : `rgba(37, 99, 235, ${alpha})`;
+}
+
+function updateCorrelation(corr) {
+    // 時刻以外が変わらなければ描画しない
+    if (!changed('correlation', [corr.error, corr.correlation, corr.regime, corr.volatility])) return;
+    if (corr.error) {
+        showError('correlation-matrix', corr.error);
+        return;
+    }
+
+    // ペア構成が変わったときだけ表を作り直し、以降はセルの値と色だけ更新
+    const kind = `correlation:${corr.pairs.join(',')}`;
+    const header = corr.pairs.map(p => `<th>${p}</th>`).join('');
+    const body = corr.pairs.map((p, i) =>
+        `<tr><th>${p}</th>${corr.pairs.map((_, j) => `<td data-field="c${i}_${j}"></td>`).join('')}` +
+        `<td><span data-field="regime${i}"></span></td><td data-field="vol${i}"></td></tr>`).join('');
+    const root = skeleton('correlation-matrix', kind,
+        `<table class="correlation-matrix"><thead><tr><th></th>${header}<th>局面</th><th>ボラティリティ</th></tr></thead>` +
+        `<tbody>${body}</tbody></table>`);
+
+    corr.correlation.forEach((row, i) => row.forEach((value, j) => {
+        const cell = root.querySelector(`[data-field="c${i}_${j}"]`);
+        const text = value === null ? '-' : value.toFixed(2);
+        if (cell.textContent !== text) {
+            cell.textContent = text;
+            cell.style.background = i === j ? '' : correlationColor(value);
+        }
+    }));
+    corr.regime.forEach((regime, i) => {
+        const [label, className] = REGIME_BADGES[regime];
+        setField(root, `regime${i}`, `${label} (${corr.volatility_ratio[i].toFixed(2)})`, className);
+        setField(root, `vol${i}`, `${corr.volatility[i].toFixed(3)}%`);
+    });
+}
+
+const MAX_TRADE_ROWS = 20;
+
+function tradeKey(item) {
+    return `${item.file || ''}|${item.timestamp}|${item.message}`;
+}
+
+function updateTradeHistory(history) {
+    if (!changed('history', history)) return;
+    if (!history || history.length === 0) {
+        showMessage('trade-history', '取引履歴がありません');
+        return;
+    }
+    if (history[0].error) {
+        showError('trade-history', history[0].error);
+        return;
+    }
+
+    const root = skeleton('trade-history', 'history', '<div class="trade-log"></div>');
+    const log = root.querySelector('.trade-log');
+
+    // 表示済みの行はそのまま残し、新しい行だけ先頭に追加（history は古い順）
+    const shown = new Set(Array.from(log.children, el => el.dataset.key));
+    history.forEach(item => {
+        const key = tradeKey(item);
+        if (shown.has(key)) return;
+        const row = document.createElement('div');
+        row.className = 'trade-log-item';
+        row.dataset.key = key;
+        row.innerHTML = '<div class="timestamp"></div><div></div>';
+        row.children[0].textContent = item.timestamp;
+        row.children[1].textContent = item.message;
+        log.insertBefore(row, log.firstChild);
+    });
+    while (log.children.length > MAX_TRADE_ROWS) {
+        log.removeChild(log.lastChild);
+    }
+}
+
+// チャート更新関数
+let currentChartKey = null;
+
+async function refreshChart() {
+    lastChartRefresh = Date.now();
+    try {
+        const response = await fetch('/api/chart');
+        const chart = await response.json();
+        if (chart.status !== 'success') {
+            console.error('チャート生成エラー:', chart.message);
+            return;
+        }
+
+        // 入力データが変わっていなければ画像は差し替えない
+        if (chart.key === currentChartKey) return;
+        currentChartKey = chart.key;
+
+        const chartImg = document.getElementById('price-chart');
+        chartImg.srcset = `${chart.sizes.thumb} 720w, ${chart.sizes.medium} 1440w, ${chart.sizes.full} 2400w`;
+        chartImg.src = chart.sizes.full;
+    } catch (error) {
+        console.error('チャート取得エラー:', error);
+    }
+}
+
+// 表示中のみポーリング（非表示タブではタイマーを止める）
+async function poll() {
+    clearTimeout(pollTimer);
+    pollTimer = null;
+    if (document.hidden) return;
+
+    await updateDashboard();
+    if (Date.now() - lastChartRefresh >= CHART_INTERVAL) {
+        refreshChart();
+    }
+    if (!document.hidden) {
+        pollTimer = setTimeout(poll, pollDelay);
+    }
+}
+
+document.addEventListener('visibilitychange', () => {
+    if (document.hidden) {
+        clearTimeout(pollTimer);
+        pollTimer = null;
+    } else if (pollTimer === null) {
+        // 復帰時はすぐに最新化
+        poll();
+    }
+});
+
+// 初回読み込み（updateDashboard / refreshChart を含む）
+poll();
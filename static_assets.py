@@ -0,0 +1,144 @@
+"""
+フィンガープリント付き静的アセット
+
+static/ 以下の CSS・JavaScript を内容ハッシュ付きのファイル名（例: dashboard.3f9a1c2b7d4e.css）で
+出力ディレクトリに書き出し、gzip・brotli の圧縮版も起動時に1回だけ作成する。
+ファイル名が内容で決まるため、配信時は永続キャッシュ（immutable）を指定できる。
+
+    python static_assets.py   # ビルドのみ実行（デプロイ時の事前生成用）
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli 未インストール時は gzip のみ
+    brotli = None
+
+ASSET_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.map')
+HASH_LENGTH = 12
+# 圧縮してもこれ以下のサイズなら圧縮版を使わない
+MIN_COMPRESS_SIZE = 256
+
+
+def compress_variants(data):
+    """{'identity', 'gzip', 'br'} の各エンコーディングのバイト列（効果が無いものは省く）"""
+    variants = {'identity': data}
+    if len(data) < MIN_COMPRESS_SIZE:
+        return variants
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        variants['gzip'] = compressed
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            variants['br'] = compressed
+    return variants
+
+
+def negotiate(accept_encoding, available):
+    """Accept-Encoding から配信するエンコーディングを選ぶ（br > gzip > identity）"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ('br', 'gzip'):
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in available and q > 0:
+            return encoding
+    return 'identity'
+
+
+class StaticAssets:
+    """静的アセットのビルド結果（論理名 -> フィンガープリント付きファイル名と圧縮版）"""
+
+    def __init__(self, source_dir, build_dir, prefix='/assets'):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.manifest = {}   # 'css/dashboard.css' -> 'css/dashboard.<hash>.css'
+        self._files = {}     # フィンガープリント付き名 -> (mimetype, variants, etag)
+
+    def build(self):
+        """全アセットのハッシュ計算・書き出し・圧縮（内容が同じファイルは書き直さない）
+
+        Returns:
+            dict: manifest
+        """
+        manifest, files = {}, {}
+        for root, _, names in os.walk(self.source_dir):
+            for name in sorted(names):
+                if not name.endswith(ASSET_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                logical = os.path.relpath(path, self.source_dir).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+
+                digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+                stem, ext = os.path.splitext(logical)
+                fingerprinted = f'{stem}.{digest}{ext}'
+                variants = compress_variants(data)
+                self._write(fingerprinted, variants)
+
+                mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                if mimetype.startswith('text/') or mimetype == 'application/javascript':
+                    mimetype += '; charset=utf-8'
+                manifest[logical] = fingerprinted
+                files[fingerprinted] = (mimetype, variants, digest)
+
+        with self._lock:
+            self.manifest, self._files = manifest, files
+        return manifest
+
+    def _write(self, fingerprinted, variants):
+        """ビルド出力（CDN・リバースプロキシからの直接配信用）"""
+        suffixes = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+        for encoding, data in variants.items():
+            path = os.path.join(self.build_dir, fingerprinted + suffixes[encoding])
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def url(self, logical):
+        """テンプレート用: 論理名からフィンガープリント付きURLを返す"""
+        return f'{self.prefix}/{self.manifest[logical]}'
+
+    def lookup(self, name, accept_encoding=None):
+        """配信内容を取得
+
+        Returns:
+            tuple: (本文, mimetype, エンコーディング, ETag) または None
+        """
+        with self._lock:
+            entry = self._files.get(name)
+        if entry is None:
+            return None
+        mimetype, variants, etag = entry
+        encoding = negotiate(accept_encoding, variants)
+        return variants[encoding], mimetype, encoding, etag
+
+
+if __name__ == '__main__':
+    base = os.path.dirname(os.path.abspath(__file__))
+    assets = StaticAssets(os.path.join(base, 'static'), os.path.join(base, 'outputs', 'assets'))
+    for logical, fingerprinted in assets.build().items():
+        print(f'{logical} -> {fingerprinted}')
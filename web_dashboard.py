@@ -4,17 +4,96 @@
 両方の実行中システム（固定モデル vs 適応学習モデル）を監視
 """
 
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 import os
 import json
 import glob
+import hashlib
+import threading
 from datetime import datetime, timedelta
-import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from prediction_ledger import PredictionLedger, LEDGER_DTYPE
+from chart_cache import ChartCache, CHART_SIZES, KEY_PATTERN, chart_key
+from ohlc_pyramid import OHLCPyramid, TIMEFRAMES, infer_timeframe
+from log_index import LogIndex, parse_time, query_words
+from shared_cache import SharedCache
+from risk_simulator import RiskSimulator
+from compact_frame import MemoryAccounting, compact_enabled, epoch_seconds, frames_nbytes
+from static_assets import StaticAssets, compress_variants, negotiate
+from correlation_matrix import StreamingCorrelation
+import backtest
+
 app = Flask(__name__)
 
+# フィンガープリント付き静的アセット（起動時にハッシュ計算・gzip/brotli 圧縮を1回だけ行う）
+assets = StaticAssets(os.path.join(app.root_path, 'static'), os.path.join('outputs', 'assets'))
+assets.build()
+app.jinja_env.globals['asset_url'] = assets.url
+
+# 描画済みトップページ（テンプレートはアセットが変わらない限り同じ内容）
+_index_page = None
+_index_lock = threading.Lock()
+# 開発用: リクエストごとにアセットを再ビルドしてトップページを描画し直す（DASHBOARD_RELOAD_ASSETS=1）
+RELOAD_ASSETS = os.environ.get('DASHBOARD_RELOAD_ASSETS', '0').lower() in ('1', 'true', 'yes')
+
+# シグナル台帳（両モデルの予測を記録し、実測精度を集計）
+ledger = PredictionLedger(os.path.join('outputs', 'prediction_ledger.bin'))
+
+# 描画済みチャート（入力データ+描画パラメータのハッシュをキーに保存）
+chart_cache = ChartCache(os.path.join('outputs', 'charts'), max_entries=32)
+# バックテストのヒートマップ（任意のクエリで価格チャートが追い出されないよう別に管理）
+heatmap_cache = ChartCache(os.path.join('outputs', 'charts', 'backtest'), max_entries=32)
+
+# 通貨ペア -> マルチタイムフレームOHLC（ベースフィードから逐次集約）
+pyramids = {}
+_pyramid_lock = threading.Lock()
+
+# 取引ログの検索インデックス（追記分のみ取り込み）
+LOG_PATTERN = os.path.join('logs', '*.log')
+log_index = LogIndex(os.path.join('outputs', 'log_index.pkl'))
+
+# ワーカー間共有キャッシュ（期限切れ時は1ワーカーだけが再計算）
+shared = SharedCache(os.path.join('outputs', 'shared_cache'))
+SNAPSHOT_TTL = float(os.environ.get('DASHBOARD_SNAPSHOT_TTL', 15))
+CHART_TTL = float(os.environ.get('DASHBOARD_CHART_TTL', 300))
+
+# 適応モデルのサイズ設定に対するモンテカルロ・リスク評価（設定・ボラティリティ局面ごとにキャッシュ）
+risk_simulator = RiskSimulator(
+    n_paths=int(os.environ.get('DASHBOARD_RISK_PATHS', 20000)),
+    memory_mb=float(os.environ.get('DASHBOARD_RISK_MEMORY_MB', 64))
+)
+
+# 通貨ペア間の相関・ボラティリティ局面（新しいバーだけをランク1更新で取り込む）
+PAIRS = [p.strip() for p in os.environ.get(
+    'DASHBOARD_PAIRS', 'USD/JPY,EUR/USD,GBP/USD,AUD/USD,EUR/JPY').split(',') if p.strip()]
+correlation = StreamingCorrelation(PAIRS, window=int(os.environ.get('DASHBOARD_CORRELATION_WINDOW', 100)))
+
+# コンパクトモード（価格を float32 で保持。DASHBOARD_COMPACT=1 で有効）
+COMPACT = compact_enabled()
+PRICE_DTYPE = np.float32 if COMPACT else np.float64
+
+# 共有キャッシュに保存するOHLC配列
+OHLC_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', PRICE_DTYPE),
+    ('high', PRICE_DTYPE),
+    ('low', PRICE_DTYPE),
+    ('close', PRICE_DTYPE),
+])
+
+def _bar_times(hist_data):
+    """データフレームのインデックスをUNIX秒に変換（インデックスの時間分解能に依存しない）"""
+    return epoch_seconds(hist_data.index)
+
+def record_signal(model, pair, hist_data, signal):
+    """シグナルを台帳に記録し、到着済みバーで過去シグナルを判定"""
+    bar_times = _bar_times(hist_data)
+    closes = hist_data['close'].to_numpy()
+    ledger.resolve(pair, bar_times, closes)
+    ledger.append(model, pair, signal, bar_times[-1], closes[-1])
+
 def get_task_status():
     """実行中タスクの状態を取得"""
     return {
@@ -49,6 +128,7 @@ def get_latest_prediction():
 
         # 予測
         signal = bot.predict_signal(features_df)
+        record_signal('fixed', 'USD/JPY', hist_data, signal)
 
         # 取引判定
         will_trade = (
@@ -79,8 +159,16 @@ def get_adaptive_parameters():
         hist_data = bot.get_historical_data()
         bot.check_and_adapt_parameters(hist_data)
 
-        # ボラティリティ計算
-        volatility = hist_data['close'].pct_change().tail(20).std()
+        # 適応モデルのシグナルも台帳に記録
+        try:
+            signal = bot.predict_signal(bot.generate_features(hist_data))
+            record_signal('adaptive', 'USD/JPY', hist_data, signal)
+        except Exception:
+            pass
+
+        # ボラティリティ計算（直近21本の終値だけから求める）
+        closes = hist_data['close'].to_numpy()[-21:]
+        volatility = np.std(closes[1:] / closes[:-1] - 1, ddof=1)
 
         return {
             'kelly_fraction': float(bot.kelly_fraction),
@@ -94,48 +182,120 @@ def get_adaptive_parameters():
     except Exception as e:
         return {'error': str(e)}
 
-def get_trade_history():
-    """取引履歴を取得（最新20件）"""
+def get_risk_simulation():
+    """現在の Kelly分数・最大レバレッジで想定される破産確率・ドローダウン・最終資産分布"""
     try:
-        # ログファイルから取引履歴を抽出
-        log_files = glob.glob('logs/adaptive_demo_*.log') + glob.glob('logs/demo_*.log')
+        params = json.loads(snapshot_json('adaptive_params', get_adaptive_parameters))
+        if 'error' in params:
+            return {'error': params['error']}
+
+        closes = np.asarray(get_ohlc_array()['close'], dtype=np.float64)
+        returns = closes[1:] / closes[:-1] - 1
+
+        # 実測の的中率が十分に溜まっていれば方向の当たり外れに使う
+        recent = ledger.stats()['adaptive']['windows'][200]
+        win_rate = recent['accuracy'] if recent['count'] >= 30 else None
+
+        result = risk_simulator.run(returns[-500:], params['kelly_fraction'],
+                                    params['max_leverage'], win_rate=win_rate)
+        result['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return result
+    except Exception as e:
+        return {'error': str(e)}
+
+def _history_args(args):
+    """/api/history のクエリ文字列を get_trade_history の引数に変換（不正な値は ValueError）"""
+    kwargs = {key: args.get(key) for key in ('q', 'level', 'pair', 'model') if args.get(key)}
+    query_words(kwargs.get('q'))
+    try:
+        kwargs['start'] = parse_time(args.get('from'))
+        kwargs['end'] = parse_time(args.get('to'))
+    except ValueError as e:
+        raise ValueError(f'日時の形式が不正です: {e}')
+    try:
+        kwargs['limit'] = min(max(int(args.get('limit', 20)), 1), 1000)
+    except ValueError:
+        pass
+    return kwargs
+
+def get_trade_history(q=None, start=None, end=None, level=None, pair=None, model=None, limit=20):
+    """取引履歴を取得（既定: 取引行の最新20件、q 指定時は全ログ行から検索）"""
+    try:
+        # 追記分だけインデックスに取り込む
+        log_index.refresh(sorted(glob.glob(LOG_PATTERN)))
+
+        hits = log_index.search(
+            q=q, start=start, end=end, level=level, pair=pair, model=model,
+            kind=None if q else 'trade', limit=limit
+        )
 
         trades = []
-        for log_file in sorted(log_files, reverse=True)[:5]:  # 最新5ファイル
-            try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if '取引実行' in line or 'TRADE' in line.upper():
-                            trades.append({
-                                'timestamp': line[:23] if len(line) > 23 else '',
-                                'message': line[23:].strip() if len(line) > 23 else line.strip()
-                            })
-            except:
-                continue
-
-        return trades[-20:]  # 最新20件
+        for hit in reversed(hits):  # 古い順
+            line = hit['line']
+            trades.append({
+                'timestamp': line[:23] if len(line) > 23 else '',
+                'message': line[23:].strip() if len(line) > 23 else line.strip(),
+                'model': hit['model'],
+                'file': os.path.basename(hit['file'])
+            })
+        return trades
     except Exception as e:
         return [{'error': str(e)}]
 
+def _format_accuracy(entry):
+    """精度エントリを表示用文字列に変換"""
+    if not entry['count']:
+        return '計測中'
+    return f"{entry['accuracy'] * 100:.1f}% (n={entry['count']})"
+
+def _format_metric(value, digits=3):
+    return '計測中' if value is None else f'{value:.{digits}f}'
+
+def get_prediction_accuracy():
+    """台帳から計測したモデル別の精度・較正"""
+    try:
+        return ledger.stats()
+    except Exception as e:
+        return {'error': str(e)}
+
 def get_system_comparison():
-    """固定モデル vs 適応学習モデルの比較"""
-    return {
-        'features': [
+    """固定モデル vs 適応学習モデルの比較（精度は台帳からの実測値）"""
+    stats = get_prediction_accuracy()
+    measured = []
+    if 'error' not in stats:
+        fixed, adaptive = stats['fixed'], stats['adaptive']
+        for n in fixed['windows']:
+            measured.append({
+                'name': f'予測精度（直近{n}件）',
+                'fixed': _format_accuracy(fixed['windows'][n]),
+                'adaptive': _format_accuracy(adaptive['windows'][n])
+            })
+        measured += [
             {
-                'name': '予測精度（初期）',
-                'fixed': '93%',
-                'adaptive': '93%'
+                'name': '予測精度（累計）',
+                'fixed': _format_accuracy(fixed['total']),
+                'adaptive': _format_accuracy(adaptive['total'])
             },
             {
-                'name': '予測精度（1ヶ月後）',
-                'fixed': '93%',
-                'adaptive': '93-95%'
+                'name': 'Brierスコア',
+                'fixed': _format_metric(fixed['total']['brier']),
+                'adaptive': _format_metric(adaptive['total']['brier'])
             },
             {
-                'name': '予測精度（6ヶ月後）',
-                'fixed': '70-80%（劣化）',
-                'adaptive': '95-96%（改善）'
+                'name': '較正誤差（ECE）',
+                'fixed': _format_metric(fixed['calibration']['ece']),
+                'adaptive': _format_metric(adaptive['calibration']['ece'])
             },
+            {
+                'name': '判定待ちシグナル',
+                'fixed': f"{fixed['pending']}件",
+                'adaptive': f"{adaptive['pending']}件"
+            }
+        ]
+
+    return {
+        'accuracy': stats,
+        'features': measured + [
             {
                 'name': '市場変化適応',
                 'fixed': 'なし',
@@ -169,106 +329,440 @@ def get_system_comparison():
         ]
     }
 
-def get_market_statistics():
-    """市場統計を取得"""
-    try:
+def snapshot_json(name, func, *args):
+    """ワーカー間で共有するJSONスナップショット（bytes）"""
+    return shared.get_or_refresh(
+        name, SNAPSHOT_TTL,
+        lambda: json.dumps(func(*args), ensure_ascii=False).encode('utf-8')
+    )
+
+def json_bytes_response(payload):
+    """シリアライズ済みJSONをそのまま返す（内容が同じなら 304）"""
+    response = app.response_class(payload, mimetype='application/json')
+    response.set_etag(payload_etag(payload))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def payload_etag(payload):
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def _ohlc_array(hist_data):
+    """データフレームを共有用のOHLC配列に変換"""
+    ohlc = np.empty(len(hist_data), dtype=OHLC_DTYPE)
+    ohlc['time'] = _bar_times(hist_data)
+    ohlc['close'] = hist_data['close'].to_numpy()
+    ohlc['open'] = hist_data['open'].to_numpy() if 'open' in hist_data else ohlc['close']
+    ohlc['high'] = hist_data['high'].to_numpy()
+    ohlc['low'] = hist_data['low'].to_numpy()
+    return ohlc
+
+def get_ohlc_array(pair='USD/JPY'):
+    """ベースフィードのOHLC配列（共有キャッシュ上のビュー、取得は選出ワーカーのみ）"""
+    def fetch():
         from paper_trading_bot import PaperTradingBot
-        bot = PaperTradingBot(pair='USD/JPY', initial_capital=10000)
+        bot = PaperTradingBot(pair=pair, initial_capital=10000)
+        return _ohlc_array(bot.get_historical_data())
+    return shared.get_or_refresh('ohlc_' + pair.replace('/', ''), SNAPSHOT_TTL, fetch)
+
+def update_pyramid(pair, ohlc):
+    """ベースフィードの新しいバーだけをOHLCピラミッドに取り込む"""
+    with _pyramid_lock:
+        pyramid = pyramids.get(pair)
+        if pyramid is None:
+            pyramid = pyramids[pair] = OHLCPyramid(base=infer_timeframe(ohlc['time']), dtype=PRICE_DTYPE)
+    pyramid.update(ohlc['time'], ohlc['open'], ohlc['high'], ohlc['low'], ohlc['close'])
+    return pyramid
+
+def _timeframe_args(args, default_tf='1h', default_bars=24):
+    """クエリ文字列から (タイムフレーム, 本数) を取得"""
+    timeframe = args.get('tf', default_tf)
+    try:
+        bars = max(int(args.get('bars', default_bars)), 2)
+    except ValueError:
+        bars = default_bars
+    return timeframe, bars
 
-        hist_data = bot.get_historical_data()
-        recent_data = hist_data.tail(24)  # 過去24時間
+def _load_pyramid(pair='USD/JPY'):
+    """最新データでピラミッドを更新"""
+    return update_pyramid(pair, get_ohlc_array(pair))
 
-        if len(recent_data) >= 2:
-            price_change = ((recent_data['close'].iloc[-1] / recent_data['close'].iloc[0]) - 1) * 100
-            volatility = recent_data['close'].pct_change().std() * 100
+def get_market_statistics(timeframe='1h', bars=24):
+    """市場統計を取得（既定: 1時間足24本 = 過去24時間）"""
+    try:
+        recent = _load_pyramid().bars(timeframe, bars)
 
-            return {
-                '24h_change': float(price_change),
+        if len(recent['close']) >= 2:
+            close = recent['close']
+            price_change = ((close[-1] / recent['open'][0]) - 1) * 100
+            volatility = np.std(close[1:] / close[:-1] - 1, ddof=1) * 100
+
+            stats = {
+                'timeframe': timeframe,
+                'bars': int(len(close)),
+                'change': float(price_change),
                 'volatility': float(volatility),
-                'high': float(recent_data['high'].max()),
-                'low': float(recent_data['low'].min()),
-                'current': float(recent_data['close'].iloc[-1]),
+                'high': float(recent['high'].max()),
+                'low': float(recent['low'].min()),
+                'current': float(close[-1]),
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
+            if TIMEFRAMES[timeframe] * bars == 86400:
+                stats['24h_change'] = stats['change']
+            return stats
         else:
             return {'error': 'Insufficient data'}
     except Exception as e:
         return {'error': str(e)}
 
+def get_correlation_matrix():
+    """全ペアのリターン相関行列とボラティリティ局面"""
+    try:
+        series = {}
+        for pair in PAIRS:
+            ohlc = get_ohlc_array(pair)
+            series[pair] = (ohlc['time'], ohlc['close'])
+        added = correlation.update(series)
+
+        result = correlation.snapshot()
+        if result['bars'] < 2:
+            return {'error': 'Insufficient data'}
+        result['added'] = added
+        result['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return result
+    except Exception as e:
+        return {'error': str(e)}
+
+def get_ohlc_bars(timeframe='1h', bars=200):
+    """指定タイムフレームの集約済みOHLCバー（チャート用）"""
+    try:
+        pyramid = _load_pyramid()
+        recent = pyramid.bars(timeframe, bars)
+        return {
+            'pair': 'USD/JPY',
+            'base': pyramid.base,
+            'timeframe': timeframe,
+            'time': recent['time'].tolist(),
+            'open': recent['open'].tolist(),
+            'high': recent['high'].tolist(),
+            'low': recent['low'].tolist(),
+            'close': recent['close'].tolist()
+        }
+    except Exception as e:
+        return {'error': str(e)}
+
+def _backtest_args(args):
+    """/api/backtest のクエリ文字列を get_backtest の引数に変換（不正な値は ValueError）"""
+    model = args.get('model', 'adaptive')
+    if model not in ('fixed', 'adaptive'):
+        raise ValueError(f'不明なモデルです: {model}')
+    kwargs = {'model': model, 'horizon': min(max(int(args.get('horizon', 1)), 1), 100)}
+    for key in ('conf', 'ret', 'kelly', 'leverage'):
+        grid = backtest.parse_grid(args.get(key))
+        if grid is not None:
+            kwargs[key] = grid
+    return kwargs
+
+def get_backtest(model='adaptive', conf=None, ret=None, kelly=None, leverage=None, horizon=1):
+    """台帳のシグナルを閾値グリッドで再生したバックテスト結果
+
+    グリッドやシグナル数の問題（ValueError）はそのまま送出し、API側で 400 にする。
+    """
+    try:
+        return _run_backtest(model, conf, ret, kelly, leverage, horizon)
+    except ValueError:
+        raise
+    except Exception as e:
+        return {'error': str(e)}
+
+def _run_backtest(model, conf, ret, kelly, leverage, horizon):
+    ohlc = get_ohlc_array()
+    signals = backtest.replay_signals(ledger.records(), model, ohlc['time'], ohlc['close'], horizon)
+
+    sizing = backtest.ADAPTIVE_SIZING if model == 'adaptive' else backtest.FIXED_SIZING
+    conf = conf or backtest.DEFAULT_CONFIDENCE
+    ret = ret or backtest.default_return_grid(signals['abs_return'])
+    kelly = kelly or sizing['kelly']
+    leverage = leverage or sizing['leverage']
+
+    metrics = backtest.run_sweep(signals, conf, ret, kelly, leverage)
+
+    # ヒートマップ画像（結果が同じなら描画をスキップ）
+    h = hashlib.sha256(json.dumps([model, conf, ret, kelly, leverage, horizon]).encode('utf-8'))
+    for name in ('pnl', 'sharpe', 'max_drawdown'):
+        h.update(metrics[name].tobytes())
+    key = h.hexdigest()[:32]
+    heatmap_cache.get_or_render(key, lambda: _backtest_figure(metrics, conf, ret))
+
+    return {
+        'model': model,
+        'horizon': horizon,
+        'n_signals': int(len(signals['time'])),
+        'grid': {'confidence': conf, 'min_return': ret, 'kelly': kelly, 'leverage': leverage},
+        'metrics': {name: metrics[name].tolist()
+                    for name in ('pnl', 'sharpe', 'max_drawdown', 'trades', 'win_rate')},
+        'best': metrics['best'],
+        'heatmap_url': heatmap_cache.urls(key, prefix='/charts/backtest')['full'],
+        'heatmap_sizes': heatmap_cache.urls(key, prefix='/charts/backtest'),
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def _backtest_figure(metrics, conf, ret):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    return backtest.plot_heatmap(metrics, conf, ret, Figure(figsize=(18, 6)))
+
+def _pyramids_nbytes():
+    with _pyramid_lock:
+        return sum(p.nbytes for p in pyramids.values())
+
+# コンポーネント別の保持メモリ（/api/memory）
+memory = MemoryAccounting()
+memory.register('shared_cache', shared.nbytes)
+memory.register('ohlc_pyramids', _pyramids_nbytes)
+memory.register('log_index', log_index.nbytes)
+memory.register('compact_frames', lambda: sum(frames_nbytes()[k] for k in ('values', 'indexes')))
+
+def get_memory_usage():
+    """コンポーネント別メモリとプロセスRSS（このワーカー）"""
+    report = memory.report()
+    report.update({
+        'pid': os.getpid(),
+        'compact': COMPACT,
+        'price_dtype': np.dtype(PRICE_DTYPE).name,
+        'frames': frames_nbytes(),
+        # 予測台帳は必要時に memmap するだけで常駐しないため、保持メモリ（tracked）には含めない
+        'disk_bytes': {'prediction_ledger': len(ledger) * LEDGER_DTYPE.itemsize},
+        'limits': {'risk_simulation': int(risk_simulator.memory_mb * 2**20)},
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    })
+    return report
+
+def encoded_response(body, mimetype, encoding, etag, cache_control):
+    """圧縮済みの本文を返す（ETag 一致なら 304）"""
+    response = app.response_class(body, mimetype=mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    # 圧縮方式ごとに別の表現なので ETag も分ける
+    response.set_etag(etag if encoding == 'identity' else f'{etag}-{encoding}')
+    return response.make_conditional(request)
+
+def _render_index():
+    """トップページを1回だけ描画して圧縮版とともに保持"""
+    global _index_page
+    with _index_lock:
+        # 開発時はテンプレート・CSS・JS の編集を反映するため毎回ビルドして描画
+        if _index_page is None or RELOAD_ASSETS:
+            if _index_page is not None:
+                assets.build()
+            html = render_template('dashboard.html').encode('utf-8')
+            _index_page = (compress_variants(html), payload_etag(html))
+        return _index_page
+
 @app.route('/')
 def index():
-    """メインダッシュボードページ"""
-    return render_template('dashboard.html')
+    """メインダッシュボードページ（描画済みHTMLを再利用し、再訪時は 304）"""
+    variants, etag = _render_index()
+    encoding = negotiate(request.headers.get('Accept-Encoding'), variants)
+    return encoded_response(variants[encoding], 'text/html; charset=utf-8', encoding, etag, 'no-cache')
+
+@app.route('/assets/<path:name>')
+def asset(name):
+    """フィンガープリント付きアセット（内容が変わればURLも変わるため永続キャッシュ可）"""
+    found = assets.lookup(name, request.headers.get('Accept-Encoding'))
+    if found is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    body, mimetype, encoding, etag = found
+    return encoded_response(body, mimetype, encoding, etag, 'public, max-age=31536000, immutable')
+
+# スナップショット名 -> 取得関数（/api/status の並び順。予測の台帳記録を比較表より先に行う）
+SNAPSHOTS = {
+    'tasks': get_task_status,
+    'prediction': get_latest_prediction,
+    'adaptive_params': get_adaptive_parameters,
+    'market_stats': get_market_statistics,
+    'system_comparison': get_system_comparison,
+    'trade_history': get_trade_history,
+    'correlation': get_correlation_matrix,
+}
+
+def status_snapshot():
+    """統合ステータス（各要素のシリアライズ済みJSONを連結）"""
+    parts = [b'"%s":%s' % (name.encode('ascii'), snapshot_json(name, func))
+             for name, func in SNAPSHOTS.items()]
+    return b'{' + b','.join(parts) + b'}'
 
 @app.route('/api/status')
 def api_status():
     """統合ステータスAPI"""
-    return jsonify({
-        'tasks': get_task_status(),
-        'prediction': get_latest_prediction(),
-        'adaptive_params': get_adaptive_parameters(),
-        'market_stats': get_market_statistics(),
-        'system_comparison': get_system_comparison(),
-        'trade_history': get_trade_history()
-    })
+    return json_bytes_response(status_snapshot())
 
 @app.route('/api/tasks')
 def api_tasks():
     """タスク状態API"""
-    return jsonify(get_task_status())
+    return json_bytes_response(snapshot_json('tasks', get_task_status))
 
 @app.route('/api/prediction')
 def api_prediction():
     """最新予測API"""
-    return jsonify(get_latest_prediction())
+    return json_bytes_response(snapshot_json('prediction', get_latest_prediction))
 
 @app.route('/api/adaptive')
 def api_adaptive():
     """適応パラメータAPI"""
-    return jsonify(get_adaptive_parameters())
+    return json_bytes_response(snapshot_json('adaptive_params', get_adaptive_parameters))
 
 @app.route('/api/market')
 def api_market():
-    """市場統計API"""
-    return jsonify(get_market_statistics())
+    """市場統計API（?tf=1h&bars=24）"""
+    timeframe, bars = _timeframe_args(request.args)
+    if (timeframe, bars) == _timeframe_args({}):
+        # 既定の条件だけをワーカー間で共有（任意のクエリごとに共有キャッシュを作らない）
+        return json_bytes_response(snapshot_json('market_stats', get_market_statistics))
+    return jsonify(get_market_statistics(timeframe, bars))
+
+@app.route('/api/ohlc')
+def api_ohlc():
+    """マルチタイムフレームOHLC API（?tf=4h&bars=200）"""
+    return jsonify(get_ohlc_bars(*_timeframe_args(request.args, default_bars=200)))
 
 @app.route('/api/history')
 def api_history():
-    """取引履歴API"""
-    return jsonify(get_trade_history())
+    """取引履歴・ログ検索API（?q=...&from=...&to=...&level=...&pair=...&model=...）"""
+    try:
+        kwargs = _history_args(request.args)
+    except ValueError as e:
+        return jsonify([{'error': str(e)}]), 400
+    if kwargs == {'start': None, 'end': None, 'limit': 20}:
+        # 既定の取引一覧はワーカー間で共有
+        return json_bytes_response(snapshot_json('trade_history', get_trade_history))
+    return jsonify(get_trade_history(**kwargs))
+
+@app.route('/api/correlation')
+def api_correlation():
+    """通貨ペア相関・ボラティリティ局面API"""
+    return json_bytes_response(snapshot_json('correlation', get_correlation_matrix))
 
 @app.route('/api/comparison')
 def api_comparison():
     """システム比較API"""
-    return jsonify(get_system_comparison())
+    return json_bytes_response(snapshot_json('system_comparison', get_system_comparison))
+
+@app.route('/api/accuracy')
+def api_accuracy():
+    """実測精度API（モデル別・ウィンドウ別の精度と較正）"""
+    return jsonify(get_prediction_accuracy())
+
+@app.route('/api/backtest')
+def api_backtest():
+    """閾値バックテストAPI（?model=adaptive&conf=0.5:0.9:0.05&ret=...&kelly=...&leverage=...&horizon=1）"""
+    try:
+        kwargs = _backtest_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'パラメータが不正です: {e}'}), 400
+
+    try:
+        if kwargs == {'model': kwargs['model'], 'horizon': 1}:
+            # 既定グリッドの結果だけをワーカー間で共有（任意のクエリごとに共有キャッシュを作らない）
+            return json_bytes_response(
+                snapshot_json(f"backtest_{kwargs['model']}", get_backtest, kwargs['model'])
+            )
+        return jsonify(get_backtest(**kwargs))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/risk')
+def api_risk():
+    """リスクシミュレーションAPI（適応モデルの現在のサイズ設定）"""
+    return json_bytes_response(snapshot_json('risk', get_risk_simulation))
+
+@app.route('/api/memory')
+def api_memory():
+    """メモリ計測API（ワーカーごとの値のため共有キャッシュは使わない）"""
+    return jsonify(get_memory_usage())
+
+def render_price_chart(days=180):
+    """価格チャートを生成してキーを返す（同じデータ・パラメータなら描画をスキップ）
+
+    ワーカー間では共有キャッシュで選出された1ワーカーだけがデータ取得・描画を行い、
+    他のワーカーは画像ファイル（outputs/charts）をそのまま配信する。
+    """
+    def produce():
+        key, cached = _render_price_chart(days)
+        return json.dumps({'key': key, 'cached': cached}).encode('utf-8')
+
+    chart = json.loads(shared.get_or_refresh(f'price_chart_{int(days)}', CHART_TTL, produce))
+    if not chart_cache.get(chart['key']):
+        # 共有キーの画像が削除済み（LRU・他ワーカーの削除）なら描画し直す
+        return _render_price_chart(days)
+    return chart['key'], chart['cached']
+
+def _render_price_chart(days):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from show_price_chart import fetch_price_data, plot_price_chart
+
+    params = {'chart': 'price', 'symbol': 'USDJPY=X', 'days': days, 'figsize': (16, 12)}
+    data = fetch_price_data(params['symbol'], days=days, compact=COMPACT)
+    if data.empty:
+        raise ValueError('データが取得できませんでした')
+
+    key = chart_key(data, params)
+    cached = chart_cache.get_or_render(
+        key, lambda: plot_price_chart(data, fig=Figure(figsize=params['figsize']))
+    )
+    return key, cached
 
 @app.route('/api/chart')
 def api_chart():
     """価格チャート生成API"""
-    import subprocess
-
-    # チャート生成
     try:
-        subprocess.run(['python', 'show_price_chart.py'],
-                      timeout=30,
-                      capture_output=True,
-                      cwd='D:/FX')
-        return jsonify({'status': 'success', 'chart_url': '/chart_image'})
+        key, cached = render_price_chart()
+        urls = chart_cache.urls(key)
+        return jsonify({
+            'status': 'success',
+            'key': key,
+            'cached': cached,
+            'chart_url': urls['full'],
+            'sizes': urls
+        })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
-@app.route('/chart_image')
-def chart_image():
-    """チャート画像を配信"""
+@app.route('/charts/<key>/<size>.png')
+def chart_by_key(key, size):
+    """コンテンツアドレス型チャート画像（内容が変わらないため永続キャッシュ可）"""
+    return _send_chart(chart_cache, key, size)
+
+@app.route('/charts/backtest/<key>/<size>.png')
+def heatmap_by_key(key, size):
+    """バックテストのヒートマップ画像"""
+    return _send_chart(heatmap_cache, key, size)
+
+def _send_chart(cache, key, size):
     from flask import send_file
-    import os
 
-    chart_path = os.path.join('outputs', 'usd_jpy_price_chart.png')
-    if os.path.exists(chart_path):
-        return send_file(chart_path, mimetype='image/png')
-    else:
+    if not KEY_PATTERN.match(key) or size not in CHART_SIZES or not cache.get(key):
         return jsonify({'error': 'Chart not found'}), 404
 
+    response = send_file(cache.path(key, size), mimetype='image/png', etag=key + '-' + size)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/chart_image')
+def chart_image():
+    """最新チャート画像を配信（互換用）"""
+    from flask import redirect
+
+    try:
+        key, _ = render_price_chart()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 404
+    return redirect(chart_cache.urls(key)['full'])
+
 if __name__ == '__main__':
     # templatesディレクトリ作成
     os.makedirs('templates', exist_ok=True)